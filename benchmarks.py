@@ -0,0 +1,255 @@
+"""Benchmarks for the fitflow_combined hot paths
+
+Generates synthetic meals, daily logs, posts and foods at increasing sizes
+and times the helpers the app calls most. Results are written as JSON so
+runs from different commits can be compared.
+
+    python benchmarks.py                       # 10 .. 10^5 records
+    python benchmarks.py --max-size 1000000    # up to 10^6
+    python benchmarks.py --output new.json --compare old.json
+    python benchmarks.py --memory              # dicts vs slotted records, 10^5 each
+"""
+from datetime import date, timedelta
+from typing import List, Dict, Any, Callable, Optional
+import argparse
+import contextlib
+import json
+import platform
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import fitflow_combined as ff
+
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+FOOD_WORDS = ['chicken', 'rice', 'salmon', 'oat', 'milk', 'egg', 'beef', 'yogurt', 'apple', 'banana',
+              'spinach', 'tofu', 'bread', 'pasta', 'lentil', 'almond', 'cheese', 'turkey', 'quinoa', 'bean']
+START = date(2000, 1, 1)
+
+
+# ----------------------------- Generators ------------------------------
+def make_foods(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [{'name': f"{rng.choice(FOOD_WORDS).title()} {rng.choice(FOOD_WORDS).title()} {i}",
+             'calories': rng.randint(20, 800), 'protein': rng.randint(0, 40)} for i in range(n)]
+
+
+def make_meals(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [{'log_date': (START + timedelta(days=i // 4)).isoformat(),
+             'meal_type': MEAL_TYPES[i % 4],
+             'foods': [{'name': rng.choice(FOOD_WORDS)}],
+             'total_calories': rng.randint(100, 900),
+             'total_protein': rng.randint(0, 60),
+             'total_carbs': rng.randint(0, 120),
+             'total_fat': rng.randint(0, 40)} for i in range(n)]
+
+
+def make_descriptions(n: int, rng: random.Random) -> List[str]:
+    return [f"{rng.randint(1, 300)}g {rng.choice(FOOD_WORDS)} and {rng.randint(1, 3)} cups {rng.choice(FOOD_WORDS)}"
+            for _ in range(n)]
+
+
+def make_daily_logs(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [ff.make_log((START + timedelta(days=i)).isoformat(), rng.randint(0, 12),
+                        round(rng.uniform(4, 10), 1), rng.randint(0, 20000)) for i in range(n)]
+
+
+def make_posts(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [{'id': f'p{i}', 'content': f'Post number {i}', 'likes': rng.randint(0, 500),
+             'is_anonymous': rng.random() < 0.2, 'created_by': f'user{i % 1000}', 'replies': []}
+            for i in range(n)]
+
+
+def make_plan(n: int, rng: random.Random) -> Dict[str, Any]:
+    return {'plan_name': 'Bench', 'goal': 'muscle_gain',
+            'exercises': [{'day': DAYS[i % 7], 'exercise_name': f'Exercise {i}',
+                           'sets': rng.randint(2, 5), 'reps': rng.randint(5, 15)} for i in range(n)]}
+
+
+# ----------------------------- Cases -----------------------------------
+def chart_cold(logs: List[Dict[str, Any]]) -> Any:
+    """One chart lookup with the cache emptied first, so every run recomputes."""
+    ff.chart_data.clear()
+    return ff.chart_data.time_series(logs, 'sleep_hours', 365, width=320)
+
+
+def cases(n: int, rng: random.Random, resources: contextlib.ExitStack) -> Dict[str, Callable[[], Any]]:
+    """Return name -> zero-arg callable for every benchmarked path at size ``n``.
+
+    Open snapshots are registered on ``resources``; close it once the
+    callables have been timed.
+    """
+    foods = make_foods(n, rng)
+    meals = make_meals(n, rng)
+    logs = make_daily_logs(n, rng)
+    posts = make_posts(n, rng)
+    plan = make_plan(n, rng)
+    descriptions = make_descriptions(n, rng)
+    profile = {'weight': 80, 'fitness_goal': 'muscle_gain'}
+    totals = ff.compute_daily_totals(meals)
+    meal_cols = ff.meal_log_columns(meals)
+    log_cols = ff.daily_log_columns(logs)
+    scratch = tempfile.mkdtemp(prefix='fitflow-bench-')
+    ff.write_snapshot(meals, os.path.join(scratch, 'meals.ffsnap'), ff.meal_log_schema)
+    ff.write_snapshot(logs, os.path.join(scratch, 'daily.ffsnap'), ff.daily_log_schema)
+    meal_snap = resources.enter_context(ff.open_snapshot(os.path.join(scratch, 'meals.ffsnap')))
+    log_snap = resources.enter_context(ff.open_snapshot(os.path.join(scratch, 'daily.ffsnap')))
+    shutil.rmtree(scratch)    # the mappings stay valid after unlink
+    ff.FOOD_DATABASE[:] = foods
+    ff.food_index()
+
+    return {
+        'search_foods': lambda: ff.search_foods('chicken ric'),
+        'search_foods_limit20': lambda: ff.search_foods('chicken ric', 20),
+        'estimate_many': lambda: ff.estimate_many(descriptions),
+        'compute_daily_totals': lambda: ff.compute_daily_totals(meals),
+        'compute_daily_totals_columns': lambda: ff.compute_daily_totals(meal_cols),
+        'compute_daily_totals_snapshot': lambda: ff.compute_daily_totals(meal_snap),
+        'summarize_metrics': lambda: ff.summarize_metrics(logs),
+        'summarize_metrics_columns': lambda: ff.summarize_metrics(log_cols),
+        'summarize_metrics_snapshot': lambda: ff.summarize_metrics(log_snap),
+        'time_series_from_logs': lambda: ff.time_series_from_logs(logs, 'sleep_hours', 7),
+        'chart_time_series_365_cold': lambda: chart_cold(logs),
+        'chart_time_series_365_warm': lambda: ff.chart_data.time_series(logs, 'sleep_hours', 365, width=320),
+        'generate_nutrition_insights': lambda: ff.generate_nutrition_insights(meals, profile, totals),
+        'render_post': lambda: [ff.render_post(p) for p in posts],
+        'get_today_exercises': lambda: ff.get_today_exercises(plan, 'Monday'),
+    }
+
+
+def memory_case(kind: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Bytes held by ``records`` as decoded dicts vs slotted records (tracemalloc)."""
+    lines = [json.dumps(r) for r in records]
+
+    def held(build: Callable[[], Any]) -> int:
+        tracemalloc.start()
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        return size
+
+    as_dicts = held(lambda: [json.loads(line) for line in lines])
+    as_records = held(lambda: [ff.RECORD_TYPES[kind](json.loads(line)) for line in lines])
+    return {'case': f'memory_{kind}', 'size': len(records), 'dict_bytes': as_dicts, 'record_bytes': as_records,
+            'saved_per_record': (as_dicts - as_records) / len(records)}
+
+
+def memory(n: int = 100000, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    plan = make_plan(n, rng)
+    samples = {
+        'meal': make_meals(n, rng),
+        'daily': make_daily_logs(n, rng),
+        'post': make_posts(n, rng),
+        'food': make_foods(n, rng),
+        'exercise': plan['exercises'],
+    }
+    results = []
+    for kind, records in samples.items():
+        r = memory_case(kind, records)
+        results.append(r)
+        print(f"{r['case']:30s} n={n:<8d} dicts={r['dict_bytes'] / 2**20:8.1f} MiB "
+              f"records={r['record_bytes'] / 2**20:8.1f} MiB saved={r['saved_per_record']:6.0f} B/record",
+              file=sys.stderr)
+    return results
+
+
+def time_call(fn: Callable[[], Any], budget: float = 0.2, max_repeat: int = 5) -> Dict[str, Any]:
+    """Best-of-N wall time; repeats until ``budget`` seconds or ``max_repeat`` runs."""
+    runs = []
+    spent = 0.0
+    while len(runs) < max_repeat and (not runs or spent < budget):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        runs.append(elapsed)
+        spent += elapsed
+    return {'best': min(runs), 'mean': sum(runs) / len(runs), 'repeat': len(runs)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def run(sizes: List[int], only: Optional[List[str]] = None, seed: int = 42) -> Dict[str, Any]:
+    saved_foods = list(ff.FOOD_DATABASE)
+    results = []
+    try:
+        for n in sizes:
+            with contextlib.ExitStack() as resources:
+                for name, fn in cases(n, random.Random(seed), resources).items():
+                    if only and name not in only:
+                        continue
+                    timing = time_call(fn)
+                    results.append({'case': name, 'size': n, **timing})
+                    print(f"{name:30s} n={n:<8d} best={timing['best'] * 1000:10.3f} ms", file=sys.stderr)
+    finally:
+        ff.FOOD_DATABASE[:] = saved_foods
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 1.2) -> List[str]:
+    """Return lines for cases whose best time grew by more than ``threshold`` x."""
+    before = {(r['case'], r['size']): r['best'] for r in old['results']}
+    lines = []
+    for r in new['results']:
+        prev = before.get((r['case'], r['size']))
+        if prev and r['best'] > prev * threshold:
+            lines.append(f"REGRESSION {r['case']} n={r['size']}: "
+                         f"{prev * 1000:.3f} ms -> {r['best'] * 1000:.3f} ms ({r['best'] / prev:.2f}x)")
+    return lines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark fitflow_combined hot paths')
+    parser.add_argument('--max-size', type=int, default=100000, help='Largest record count (powers of 10 from 10)')
+    parser.add_argument('--case', action='append', help='Only run this case (repeatable)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write JSON results here (default: stdout)')
+    parser.add_argument('--compare', metavar='PATH', help='Previous JSON results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Slowdown ratio reported as a regression')
+    parser.add_argument('--memory', action='store_true',
+                        help='Measure dict vs slotted-record memory at --max-size records instead of timing')
+    args = parser.parse_args()
+
+    if args.memory:
+        print(json.dumps({'commit': git_commit(), 'python': platform.python_version(),
+                          'results': memory(args.max_size, args.seed)}, indent=2))
+        sys.exit(0)
+
+    sizes = []
+    n = 10
+    while n <= args.max_size:
+        sizes.append(n)
+        n *= 10
+    report = run(sizes, args.case, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(json.load(fh), report, args.threshold)
+        for line in regressions:
+            print(line, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,53 @@
+"""
+Recycled, paged list widget for the FitFlow feeds.
+Kept out of main.py so the RecycleView machinery is only imported when the
+Nutrition or Community tab is first built.
+"""
+
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+
+
+class FeedView(RecycleView):
+    """Recycled list that pulls rows from ``fetch_page`` a page at a time.
+
+    ``fetch_page(cursor, limit)`` returns ``(rows, next_cursor)``; a None
+    cursor ends the feed. Only the rows on screen exist as widgets; the
+    next page is fetched when the user scrolls near the bottom.
+    """
+
+    def __init__(self, fetch_page, page_size=50, row_height=60, **kwargs):
+        super().__init__(**kwargs)
+        self.viewclass = 'Label'
+        layout = RecycleBoxLayout(orientation='vertical', default_size=(None, row_height),
+                                  default_size_hint=(1, None), size_hint_y=None, spacing=10)
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.cursor = None
+        self.exhausted = False
+        self.bind(scroll_y=self.on_scroll)
+        self.load_more()
+
+    def load_more(self):
+        if self.exhausted:
+            return
+        rows, self.cursor = self.fetch_page(self.cursor, self.page_size)
+        self.exhausted = self.cursor is None
+        self.data.extend(rows)
+
+    def prepend(self, row):
+        self.data.insert(0, row)
+
+    def reset(self):
+        """Drop the loaded rows and start again from the first page"""
+        self.data = []
+        self.cursor = None
+        self.exhausted = False
+        self.scroll_y = 1
+        self.load_more()
+
+    def on_scroll(self, instance, scroll_y):
+        if scroll_y <= 0.05:
+            self.load_more()
@@ -6,11 +6,42 @@ mirror the JS components and JSON schemas. Use this as a single-file
 reference or minimal runtime for testing/experimentation.
 
 Run `python fitflow_combined.py --list` to see available sections and
-`python fitflow_combined.py --demo` for a short demo run.
+`python fitflow_combined.py --demo` for a short demo run. Log histories can
+be streamed in and out of a local database with `--import-logs PATH` and
+`--export-logs PATH` (see `--help`); a `.ffsnap` path writes a memory-mapped
+binary snapshot that `open_snapshot` can aggregate without parsing. Add
+`--profile` to any run (or set FITFLOW_PROFILE=1 when importing) to time
+every public function.
 """
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Callable, Optional, Iterable, Set, Tuple, Union
+from urllib.parse import urlsplit
+from array import array
 import argparse
+import bisect
+import contextlib
+import csv
+import functools
+import heapq
+import io
+import itertools
+import json
+import logging
+import math
+import mmap
+import os
+import random
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
 
 
 # ----------------------------- Schemas ---------------------------------
@@ -70,6 +101,49 @@ user_profile_schema = {
   }
 }
 
+food_schema = {
+    'name': 'Food',
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string'},
+        'grams': {'type': 'number'},
+        'calories': {'type': 'number'},
+        'protein': {'type': 'number'},
+        'carbs': {'type': 'number'},
+        'fat': {'type': 'number'},
+    },
+    'required': ['name']
+}
+
+workout_exercise_schema = {
+    'name': 'WorkoutExercise',
+    'type': 'object',
+    'properties': {
+        'day': {'type': 'string'},
+        'exercise_name': {'type': 'string'},
+        'sets': {'type': 'number'},
+        'reps': {'type': 'number'},
+        'weight': {'type': 'number'},
+    },
+    'required': ['exercise_name']
+}
+
+body_metric_schema = {
+    'name': 'BodyMetric',
+    'type': 'object',
+    'properties': {
+        'log_date': {'type': 'string', 'format': 'date'},
+        'weight': {'type': 'number'},
+        'chest': {'type': 'number'},
+        'waist': {'type': 'number'},
+        'hips': {'type': 'number'},
+        'shoulder_width': {'type': 'number'},
+        'arms': {'type': 'number'},
+        'legs': {'type': 'number'},
+    },
+    'required': ['log_date']
+}
+
 workout_plan_schema = {
   'name': 'WorkoutPlan',
   'type': 'object',
@@ -84,6 +158,1661 @@ workout_plan_schema = {
 }
 
 
+# ----------------------------- Validation ------------------------------
+SCHEMA_FILES = {
+    'MealLog': 'Meal log.json',
+    'DailyLog': 'daily log.json',
+    'CommunityPost': 'community.json',
+    'UserProfile': 'user profile.json',
+    'WorkoutPlan': 'workout plan.json',
+}
+
+_PY_TYPES = {
+    'number': (int, float),
+    'string': (str,),
+    'boolean': (bool,),
+    'array': (list, tuple),
+    'object': (dict,),
+}
+
+_FORMATS = {
+    'date': date.fromisoformat,
+    'date-time': lambda v: datetime.fromisoformat(v.replace('Z', '+00:00')),
+}
+
+
+def load_schema(name: str, directory: Optional[str] = None) -> Dict[str, Any]:
+    """Return the JSON schema file for ``name``, or the in-code schema if the file is absent."""
+    if name in SCHEMA_FILES:
+        path = os.path.join(directory or os.path.dirname(os.path.abspath(__file__)), SCHEMA_FILES[name])
+        try:
+            with open(path, encoding='utf-8') as fh:
+                return json.load(fh)
+        except OSError:
+            pass
+    return {s['name']: s for s in (meal_log_schema, daily_log_schema, community_schema, user_profile_schema,
+                                   workout_plan_schema, food_schema, workout_exercise_schema,
+                                   body_metric_schema)}[name]
+
+
+def _compile_field(key: str, spec: Dict[str, Any]):
+    types = _PY_TYPES.get(spec.get('type'))
+    enum = frozenset(spec['enum']) if 'enum' in spec else None
+    fmt = _FORMATS.get(spec.get('format'))
+    items = spec.get('items')
+    item_validator = SchemaValidator(items) if items and items.get('type') == 'object' else None
+    is_number = spec.get('type') == 'number'
+
+    def check(value):
+        if types is not None and (not isinstance(value, types) or (is_number and isinstance(value, bool))):
+            return f"{key}: expected {spec['type']}"
+        if enum is not None and value not in enum:
+            return f"{key}: expected one of {sorted(enum)}"
+        if fmt is not None:
+            try:
+                fmt(value)
+            except ValueError:
+                return f"{key}: invalid {spec['format']}"
+        if item_validator is not None:
+            for i, item in enumerate(value):
+                result = item_validator.validate(item, fill_defaults=False)
+                if not result['valid']:
+                    return f"{key}[{i}]: " + '; '.join(result['errors'])
+        return None
+
+    return check
+
+
+class SchemaValidator:
+    """Validator compiled once from a JSON schema.
+
+    Each property becomes a specialized check closure (type, enum, format
+    and nested array items), so validating a record is a single loop over
+    prebuilt checks with no schema lookups.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.name = schema.get('name')
+        props = schema.get('properties', {})
+        self.required = tuple(schema.get('required', ()))
+        self.defaults = tuple((k, v['default']) for k, v in props.items() if 'default' in v)
+        self.checks = tuple((k, _compile_field(k, v)) for k, v in props.items())
+
+    def validate(self, record: Dict[str, Any], fill_defaults: bool = True) -> Dict[str, Any]:
+        """Return ``{'valid', 'missing', 'errors', 'record'}`` for one record.
+
+        With ``fill_defaults`` the returned record is a copy with schema
+        defaults filled in for absent fields; the input is never mutated.
+        """
+        if not isinstance(record, Mapping):
+            return {'valid': False, 'missing': [], 'errors': ['expected object'], 'record': record}
+        missing = [k for k in self.required if record.get(k) is None]
+        errors = []
+        for key, check in self.checks:
+            value = record.get(key)
+            if value is not None:
+                err = check(value)
+                if err:
+                    errors.append(err)
+        if fill_defaults and self.defaults:
+            absent = [(k, v) for k, v in self.defaults if k not in record]
+            if absent:
+                record = dict(record)
+                record.update(absent)
+        return {'valid': not missing and not errors, 'missing': missing, 'errors': errors, 'record': record}
+
+    def validate_many(self, records: Iterable[Dict[str, Any]], fill_defaults: bool = True) -> Dict[str, Any]:
+        """Validate a batch; returns the valid (default-filled) records and ``(index, errors)`` for the rest."""
+        valid, invalid = [], []
+        validate = self.validate
+        for i, record in enumerate(records):
+            result = validate(record, fill_defaults)
+            if result['valid']:
+                valid.append(result['record'])
+            else:
+                invalid.append((i, [f'missing {k}' for k in result['missing']] + result['errors']))
+        return {'valid': valid, 'invalid': invalid}
+
+
+_validators: Dict[str, SchemaValidator] = {}
+
+
+def validator_for(name: str) -> SchemaValidator:
+    """Return the cached validator for a schema name such as 'MealLog'."""
+    validator = _validators.get(name)
+    if validator is None:
+        validator = _validators[name] = SchemaValidator(load_schema(name))
+    return validator
+
+
+def validate_record(name: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    return validator_for(name).validate(record)
+
+
+# ----------------------------- Records ----------------------------------
+class Record(MutableMapping):
+    """Base for the slotted record types built by ``record_type``.
+
+    Schema properties live in ``__slots__``; an unset slot means the field
+    is absent, so ``to_dict`` round-trips the original record exactly.
+    Fields outside the schema go to a per-record ``_extra`` dict that is
+    only allocated when needed. Records behave as mutable mappings
+    (``get``, ``[]``, ``in``, ``items``, ``==`` against dicts), so helpers
+    written for dicts accept them unchanged; call ``to_dict`` before
+    ``json.dumps``.
+    """
+
+    __slots__ = ('_extra',)
+    _fields: Tuple[str, ...] = ()
+    _slotset: frozenset = frozenset()
+    _interned: frozenset = frozenset()
+    _nested: Dict[str, type] = {}
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None, **fields):
+        self._extra = None
+        for source in (data or {}, fields):
+            for k, v in source.items():
+                self[k] = v
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Record':
+        return cls(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {}
+        for k in self._fields:
+            try:
+                value = getattr(self, k)
+            except AttributeError:
+                continue
+            if k in self._nested and isinstance(value, list):
+                value = [v.to_dict() if isinstance(v, Record) else v for v in value]
+            out[k] = value
+        if self._extra:
+            out.update(self._extra)
+        return out
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._slotset:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._slotset:
+            return getattr(self, key, default)
+        return self._extra.get(key, default) if self._extra else default
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._slotset:
+            if key in self._interned and type(value) is str:
+                value = sys.intern(value)
+            elif key in self._nested and isinstance(value, list):
+                kind = self._nested[key]
+                value = [kind(v) if type(v) is dict else v for v in value]
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._slotset:
+            try:
+                object.__delattr__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for k in self._fields:
+            if hasattr(self, k):
+                yield k
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __reduce__(self):
+        return (type(self), (self.to_dict(),))
+
+
+def record_type(schema: Dict[str, Any], extra_fields: Iterable[str] = (), intern: Iterable[str] = (),
+                nested: Optional[Dict[str, type]] = None) -> type:
+    """Build a slotted ``Record`` subclass named after ``schema['name']``.
+
+    ``extra_fields`` adds slots for common off-schema keys (ids, authors),
+    string values of the ``intern`` fields are passed through
+    ``sys.intern`` so repeated values share one object, and list fields in
+    ``nested`` have their dict items converted to that record type.
+    """
+    fields = tuple(dict.fromkeys([*schema['properties'], *extra_fields]))
+    clashes = [k for k in fields if hasattr(Record, k)]
+    if clashes:
+        raise ValueError(f'record fields clash with Record attributes: {clashes}')
+    return type(schema['name'], (Record,), {
+        '__slots__': fields,
+        '__module__': __name__,
+        '__doc__': f"Slotted {schema['name']} record with fields {', '.join(fields)}.",
+        '_fields': fields,
+        '_slotset': frozenset(fields),
+        '_interned': frozenset(intern),
+        '_nested': dict(nested or {}),
+    })
+
+
+Food = record_type(food_schema, intern=('name',))
+WorkoutExercise = record_type(workout_exercise_schema, intern=('day', 'exercise_name'))
+MealLog = record_type(meal_log_schema, extra_fields=('id',), intern=('log_date', 'meal_type'),
+                      nested={'foods': Food})
+DailyLog = record_type(daily_log_schema, extra_fields=('id',), intern=('log_date',))
+CommunityPost = record_type(community_schema, extra_fields=('id', 'created_by', 'created_date'),
+                            intern=('created_by',))
+
+RECORD_TYPES = {'meal': MealLog, 'daily': DailyLog, 'post': CommunityPost, 'food': Food,
+                'exercise': WorkoutExercise}
+
+
+def as_records(kind: str, items: Iterable[Dict[str, Any]]) -> List[Record]:
+    """Convert dicts to the slotted record type for ``kind`` (see ``RECORD_TYPES``)."""
+    cls = RECORD_TYPES[kind]
+    return [cls(item) for item in items]
+
+
+def as_dicts(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return list(_plain(records))
+
+
+def _plain(records: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """Yield plain dicts for writers that JSON-encode; dicts pass through untouched."""
+    for r in records:
+        yield r.to_dict() if isinstance(r, Record) else r
+
+
+def record_dict(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a fresh plain-dict copy of a dict or ``Record``."""
+    return record.to_dict() if isinstance(record, Record) else dict(record)
+
+
+# ----------------------------- Columnar Logs ----------------------------
+class LogColumns:
+    """Columnar, array-backed store for records of one log schema.
+
+    Numeric schema properties live in ``array('d')`` columns (missing values
+    take the schema default, else 0); every other property is kept in a plain
+    list. Rows are grouped by ``log_date`` so a day can be sliced without a
+    scan. The aggregation helpers below accept either this store or a list
+    of dicts.
+    """
+
+    def __init__(self, schema: Dict[str, Any], records: Optional[Iterable[Dict[str, Any]]] = None):
+        self.schema = schema
+        props = schema['properties']
+        self.numeric = [k for k, v in props.items() if v.get('type') == 'number']
+        self.other = [k for k, v in props.items() if v.get('type') != 'number']
+        self.defaults = {k: props[k].get('default', 0) for k in self.numeric}
+        self.columns: Dict[str, Any] = {k: array('d') for k in self.numeric}
+        self.columns.update({k: [] for k in self.other})
+        self.by_date: Dict[str, List[int]] = {}
+        for record in records or ():
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self.columns['log_date'])
+
+    def append(self, record: Dict[str, Any]) -> int:
+        row = len(self)
+        for k in self.numeric:
+            value = record.get(k)
+            self.columns[k].append(self.defaults[k] if value is None else value)
+        for k in self.other:
+            self.columns[k].append(record.get(k))
+        self.by_date.setdefault(record.get('log_date'), []).append(row)
+        return row
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        out = {k: self.columns[k][i] for k in self.numeric}
+        out.update((k, self.columns[k][i]) for k in self.other if self.columns[k][i] is not None)
+        return out
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [self.row(i) for i in range(len(self))]
+
+    def dates(self) -> List[str]:
+        return sorted(d for d in self.by_date if d is not None)
+
+    def for_date(self, log_date: str) -> 'LogColumns':
+        """Return a new store holding only the rows logged on ``log_date``."""
+        return self.take(self.by_date.get(log_date, []))
+
+    def take(self, rows: List[int]) -> 'LogColumns':
+        out = LogColumns(self.schema)
+        for k in self.numeric:
+            col = self.columns[k]
+            out.columns[k] = array('d', [col[i] for i in rows])
+        for k in self.other:
+            col = self.columns[k]
+            out.columns[k] = [col[i] for i in rows]
+        for j, d in enumerate(out.columns['log_date']):
+            out.by_date.setdefault(d, []).append(j)
+        return out
+
+    def sums(self, fields: Iterable[str]) -> Dict[str, float]:
+        return {k: math.fsum(self.columns[k]) for k in fields}
+
+    def means(self, fields: Iterable[str]) -> Dict[str, float]:
+        n = len(self)
+        return {k: v / n for k, v in self.sums(fields).items()} if n else {}
+
+
+def meal_log_columns(records: Optional[Iterable[Dict[str, Any]]] = None) -> LogColumns:
+    return LogColumns(meal_log_schema, records)
+
+
+def daily_log_columns(records: Optional[Iterable[Dict[str, Any]]] = None) -> LogColumns:
+    return LogColumns(daily_log_schema, records)
+
+
+# ----------------------------- Log Snapshots ----------------------------
+SNAPSHOT_MAGIC = b'FFSNAP\x00\x00'
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct('<8sHHQQ')    # magic, version, reserved, rows, meta bytes
+_NO_STRING = 0xFFFFFFFF
+_MAX_EXACT_INT = 2 ** 53
+SNAPSHOT_SCHEMAS = {s['name']: s for s in (meal_log_schema, daily_log_schema)}
+
+
+class _StringTable:
+    """Lazily decoded view of a snapshot's string table."""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+        self._cache: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def get(self, idx: int) -> Optional[str]:
+        if idx == _NO_STRING:
+            return None
+        text = self._cache.get(idx)
+        if text is None:
+            text = self._cache[idx] = str(self._blob[self._offsets[idx]:self._offsets[idx + 1]], 'utf-8')
+        return text
+
+
+class _StringColumn:
+    """Sequence over a column of string-table indices; JSON columns decode each value."""
+
+    def __init__(self, indices, strings: _StringTable, decode: bool = False):
+        self.indices = indices
+        self.strings = strings
+        self.decode = decode
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, i: int) -> Any:
+        text = self.strings.get(self.indices[i])
+        return json.loads(text) if self.decode and text is not None else text
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def _snapshot_layout(schema: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """``(field, encoding)`` per stored column: 'f64' numbers, 'str' strings, 'json' the rest."""
+    layout = []
+    for k, spec in schema['properties'].items():
+        t = spec.get('type')
+        layout.append((k, 'f64' if t == 'number' else 'str' if t == 'string' else 'json'))
+    return layout
+
+
+def write_snapshot(records: Union[Iterable[Dict[str, Any]], LogColumns], path: str,
+                   schema: Dict[str, Any]) -> int:
+    """Write ``records`` as a binary snapshot for ``schema``; returns the row count.
+
+    Numeric properties become little-endian float64 columns; string, array
+    and object properties become uint32 indices into a deduplicated UTF-8
+    string table (non-strings JSON-encoded). Two uint32 bitmask columns
+    mark numeric fields that were missing or integral, and fields outside
+    the schema (or of the wrong type) are kept as JSON in ``_extra``, as
+    are explicit ``None`` values and ints too large for a float64, so
+    ``open_snapshot(path).to_dicts()`` returns the input records exactly.
+    The file is written next to ``path`` and renamed into place, so a
+    crash mid-write never leaves a truncated snapshot behind.
+    """
+    import tempfile
+    if isinstance(records, LogColumns):
+        records = records.to_dicts()
+    layout = _snapshot_layout(schema)
+    numeric = [k for k, enc in layout if enc == 'f64']
+    if len(numeric) > 32:
+        raise ValueError('snapshots support at most 32 numeric fields')
+    columns: Dict[str, Any] = {k: array('d') if enc == 'f64' else array('I') for k, enc in layout}
+    missing, ints, extras = array('I'), array('I'), array('I')
+    strings: Dict[str, int] = {}
+
+    def intern(text: Optional[str]) -> int:
+        if text is None:
+            return _NO_STRING
+        idx = strings.get(text)
+        if idx is None:
+            idx = strings[text] = len(strings)
+        return idx
+
+    rows = 0
+    for record in _plain(records):
+        extra = {k: v for k, v in record.items() if k not in columns}
+        miss = is_int = 0
+        for bit, k in enumerate(numeric):
+            value = record.get(k)
+            if type(value) not in (int, float):
+                if k in record:
+                    extra[k] = value
+                miss |= 1 << bit
+                value = schema['properties'][k].get('default', 0)
+            elif type(value) is int:
+                is_int |= 1 << bit
+                if abs(value) > _MAX_EXACT_INT:
+                    # The column keeps the nearest float for aggregation
+                    extra[k] = value
+            columns[k].append(value)
+        for k, enc in layout:
+            if enc == 'f64':
+                continue
+            value = record.get(k)
+            if value is None and k in record:
+                extra[k] = None
+            elif enc == 'str' and value is not None and not isinstance(value, str):
+                extra[k] = value
+                value = None
+            elif enc == 'json' and value is not None:
+                value = json.dumps(value, separators=(',', ':'))
+            columns[k].append(intern(value))
+        missing.append(miss)
+        ints.append(is_int)
+        extras.append(intern(json.dumps(extra, separators=(',', ':')) if extra else None))
+        rows += 1
+
+    blobs = [s.encode('utf-8') for s in strings]
+    offsets = array('Q', [0])
+    for b in blobs:
+        offsets.append(offsets[-1] + len(b))
+    stored = [(k, enc, columns[k]) for k, enc in layout]
+    stored += [('_missing', 'mask', missing), ('_ints', 'mask', ints), ('_extra', 'json', extras)]
+    if sys.byteorder != 'little':
+        for _, _, col in stored:
+            col.byteswap()
+        offsets.byteswap()
+
+    # Every section starts on an 8-byte boundary so it can be cast in place.
+    meta = {'schema': schema['name'], 'columns': [], 'strings': {}}
+    sections = [col for _, _, col in stored] + [offsets]
+    meta_len = 4096
+    while True:
+        pos = _SNAPSHOT_HEADER.size + meta_len
+        meta['columns'] = []
+        for (k, enc, col) in stored:
+            pos = -(-pos // 8) * 8
+            meta['columns'].append({'field': k, 'encoding': enc, 'offset': pos})
+            pos += len(col) * col.itemsize
+        pos = -(-pos // 8) * 8
+        meta['strings'] = {'count': len(blobs), 'offsets': pos, 'data': pos + len(offsets) * 8}
+        encoded = json.dumps(meta).encode('utf-8')
+        if len(encoded) <= meta_len:
+            break
+        meta_len = -(-len(encoded) // 4096) * 4096
+
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp',
+                               dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, rows, meta_len))
+            fh.write(encoded.ljust(meta_len, b' '))
+            for col in sections:
+                fh.write(b'\x00' * (-fh.tell() % 8))
+                fh.write(col.tobytes())
+            for b in blobs:
+                fh.write(b)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    return rows
+
+
+class LogSnapshot(LogColumns):
+    """Read-only ``LogColumns`` over a memory-mapped snapshot file.
+
+    Numeric columns are ``memoryview`` casts straight into the mapping, so
+    ``compute_daily_totals``, ``summarize_metrics`` and the other column
+    helpers aggregate without building a dict per row; strings are decoded
+    only when a row or column entry is read. Call ``close`` (or use it as a
+    context manager) to release the mapping.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            if len(self._mmap) < _SNAPSHOT_HEADER.size:
+                raise ValueError(f'{path} is truncated')
+            magic, version, _, rows, meta_len = _SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f'{path} is not a FitFlow snapshot')
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f'unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})')
+            start = _SNAPSHOT_HEADER.size
+            meta = json.loads(bytes(self._view(start, meta_len)))
+            schema = SNAPSHOT_SCHEMAS.get(meta['schema'])
+            if schema is None:
+                raise ValueError(f"unknown snapshot schema {meta['schema']!r}")
+            self.rows = rows
+            info = meta['strings']
+            offsets = self._cast(info['offsets'], info['count'] + 1, 'Q')
+            strings = _StringTable(offsets, self._view(info['data'], offsets[-1]))
+            self.schema = schema
+            self.numeric = [k for k, enc in _snapshot_layout(schema) if enc == 'f64']
+            self.other = [k for k, enc in _snapshot_layout(schema) if enc != 'f64']
+            self.defaults = {k: schema['properties'][k].get('default', 0) for k in self.numeric}
+            self.columns: Dict[str, Any] = {}
+            for col in meta['columns']:
+                if col['encoding'] == 'f64':
+                    self.columns[col['field']] = self._cast(col['offset'], rows, 'd')
+                elif col['encoding'] == 'mask':
+                    self.columns[col['field']] = self._cast(col['offset'], rows, 'I')
+                else:
+                    indices = self._cast(col['offset'], rows, 'I')
+                    self.columns[col['field']] = _StringColumn(indices, strings, col['encoding'] == 'json')
+            self._by_date: Optional[Dict[str, List[int]]] = None
+        except Exception:
+            self.close()
+            raise
+
+    def _view(self, offset: int, nbytes: int) -> memoryview:
+        if offset < 0 or nbytes < 0 or offset + nbytes > len(self._mmap):
+            raise ValueError(f'{self.path} is truncated: section at {offset} needs {nbytes} bytes, '
+                             f'file has {len(self._mmap)}')
+        view = memoryview(self._mmap)[offset:offset + nbytes]
+        self._views.append(view)
+        return view
+
+    def _cast(self, offset: int, count: int, code: str):
+        view = self._view(offset, count * struct.calcsize(code))
+        if sys.byteorder == 'little':
+            cast = view.cast(code)
+            self._views.append(cast)
+            return cast
+        # Big-endian hosts get a byte-swapped copy instead of a zero-copy view.
+        col = array(code, view.tobytes())
+        col.byteswap()
+        return col
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def by_date(self) -> Dict[str, List[int]]:
+        if self._by_date is None:
+            col = self.columns['log_date']
+            by_index: Dict[int, List[int]] = {}
+            for i, idx in enumerate(col.indices):
+                by_index.setdefault(idx, []).append(i)
+            self._by_date = {col.strings.get(idx): rows for idx, rows in by_index.items()}
+        return self._by_date
+
+    def append(self, record: Dict[str, Any]) -> int:
+        raise TypeError('snapshots are read-only; write a new one with write_snapshot')
+
+    def row(self, i: int) -> Dict[str, Any]:
+        missing, ints = self.columns['_missing'][i], self.columns['_ints'][i]
+        out: Dict[str, Any] = {}
+        for bit, k in enumerate(self.numeric):
+            if not missing >> bit & 1:
+                value = self.columns[k][i]
+                out[k] = int(value) if ints >> bit & 1 else value
+        for k in self.other:
+            value = self.columns[k][i]
+            if value is not None:
+                out[k] = value
+        extra = self.columns['_extra'][i]
+        if extra:
+            out.update(extra)
+        return out
+
+    def close(self) -> None:
+        self.columns = {}
+        self._by_date = None
+        for view in reversed(getattr(self, '_views', [])):
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> 'LogSnapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_snapshot(path: str) -> LogSnapshot:
+    return LogSnapshot(path)
+
+
+# ----------------------------- Local Storage ----------------------------
+_SQL_TYPES = {'number': 'NUMERIC', 'string': 'TEXT', 'boolean': 'INTEGER', 'array': 'TEXT', 'object': 'TEXT'}
+
+STORE_TABLES = {
+    'meal': {'table': 'meal_logs', 'schema': meal_log_schema, 'key': None, 'indexes': ['log_date', 'meal_type'],
+             'orders': {'recent': ('log_date',)}},
+    'daily': {'table': 'daily_logs', 'schema': daily_log_schema, 'key': 'log_date', 'indexes': []},
+    'post': {'table': 'community_posts', 'schema': community_schema, 'key': 'id', 'indexes': [],
+             'orders': {'recent': ('created_date',), 'top': ('likes', 'created_date')}},
+    'profile': {'table': 'user_profile', 'schema': user_profile_schema, 'key': None, 'indexes': []},
+    'workout_plan': {'table': 'workout_plans', 'schema': workout_plan_schema, 'key': 'plan_name', 'indexes': []},
+    'body': {'table': 'body_metrics', 'schema': body_metric_schema, 'key': 'log_date', 'indexes': []},
+}
+
+
+def _order_terms(kind: str, order: str) -> List[str]:
+    """SQL sort terms for one of ``kind``'s page orders, ending with the key (or rowid) as tie-break.
+
+    Missing values sort as 0 or '' so that, newest first, undated rows come last.
+    """
+    spec = STORE_TABLES[kind]
+    if order not in spec.get('orders', {}):
+        raise ValueError(f'{kind} records have no {order!r} order')
+    props = spec['schema']['properties']
+    terms = [f"IFNULL({c}, {0 if props.get(c, {}).get('type') == 'number' else repr('')})"
+             for c in spec['orders'][order]]
+    return terms + [spec['key'] or 'rowid']
+
+
+class LocalStore:
+    """SQLite-backed persistence for the FitFlow schemas.
+
+    One table per entry in ``STORE_TABLES`` with a column per schema
+    property; arrays and objects are stored as JSON and any field outside
+    the schema goes to an ``extra`` JSON column so records round-trip.
+    Writes are buffered and flushed with ``executemany`` in a single
+    transaction once ``batch_size`` records are pending (or on ``flush``,
+    any read, and ``close``). The database runs in WAL mode.
+    """
+
+    def __init__(self, path: str = ':memory:', batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path, cached_statements=64)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._pending: Dict[str, List[tuple]] = {}
+        self._pending_count = 0
+        self._columns: Dict[str, List[str]] = {}
+        self._sql: Dict[str, str] = {}
+        with self.conn:
+            for kind, spec in STORE_TABLES.items():
+                self._create(kind, spec)
+            self.conn.execute('CREATE TABLE IF NOT EXISTS op_log (seq INTEGER PRIMARY KEY, kind TEXT, '
+                              'record_key TEXT, op TEXT, field TEXT, value TEXT, ts REAL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, value TEXT)')
+        self._sql['op'] = ('INSERT INTO op_log (seq, kind, record_key, op, field, value, ts) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?)')
+
+    def _create(self, kind: str, spec: Dict[str, Any]) -> None:
+        props = spec['schema']['properties']
+        cols = list(props)
+        if spec['key'] and spec['key'] not in props:
+            cols.insert(0, spec['key'])
+        for order_cols in spec.get('orders', {}).values():
+            cols.extend(c for c in order_cols if c not in cols)
+        defs = {}
+        for c in cols:
+            sql_type = _SQL_TYPES.get(props.get(c, {}).get('type'), 'TEXT')
+            defs[c] = f'{c} {sql_type}' + (' UNIQUE' if c == spec['key'] else '')
+        table = spec['table']
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({", ".join(defs.values())}, extra TEXT)')
+        existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+        for c in cols:
+            if c not in existing:
+                # Databases from before the column existed kept the field in ``extra``
+                self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {defs[c]}')
+                self.conn.execute(f"UPDATE {table} SET {c} = json_extract(extra, '$.{c}') WHERE extra IS NOT NULL")
+        for c in spec['indexes']:
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{c} ON {table} ({c})')
+        if spec.get('orders'):
+            # Replaced by the per-order indexes below
+            self.conn.execute(f'DROP INDEX IF EXISTS idx_{table}_order')
+        for name in spec.get('orders', {}):
+            # Keyless tables page on rowid, which every index already carries
+            terms = _order_terms(kind, name)
+            index_cols = ', '.join(terms if spec['key'] else terms[:-1])
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{name} ON {table} ({index_cols})')
+        self._columns[kind] = cols
+        verb = 'INSERT OR REPLACE' if spec['key'] else 'INSERT'
+        marks = ', '.join('?' * (len(cols) + 1))
+        self._sql[kind] = f'{verb} INTO {table} ({", ".join(cols)}, extra) VALUES ({marks})'
+
+    def _encode(self, kind: str, record: Dict[str, Any]) -> tuple:
+        props = STORE_TABLES[kind]['schema']['properties']
+        if isinstance(record, Record):
+            record = record.to_dict()
+        row = []
+        for c in self._columns[kind]:
+            value = record.get(c)
+            if value is not None and props.get(c, {}).get('type') in ('array', 'object'):
+                value = json.dumps(value)
+            row.append(value)
+        extra = {k: v for k, v in record.items() if k not in self._columns[kind]}
+        row.append(json.dumps(extra) if extra else None)
+        return tuple(row)
+
+    def _decode(self, kind: str, row: tuple) -> Dict[str, Any]:
+        props = STORE_TABLES[kind]['schema']['properties']
+        record = {}
+        for c, value in zip(self._columns[kind], row):
+            if value is None:
+                continue
+            t = props.get(c, {}).get('type')
+            if t in ('array', 'object'):
+                value = json.loads(value)
+            elif t == 'boolean':
+                value = bool(value)
+            record[c] = value
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        return record
+
+    def put(self, kind: str, record: Dict[str, Any]) -> None:
+        """Queue ``record`` for writing; flushes once the batch is full."""
+        self._pending.setdefault(kind, []).append(self._encode(kind, record))
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def put_many(self, kind: str, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.put(kind, record)
+
+    def flush(self) -> int:
+        if not self._pending_count:
+            return 0
+        written = self._pending_count
+        with self.conn:
+            for kind, rows in self._pending.items():
+                self.conn.executemany(self._sql[kind], rows)
+        self._pending = {}
+        self._pending_count = 0
+        return written
+
+    def iter_load(self, kind: str, start: Optional[str] = None, end: Optional[str] = None,
+                  meal_type: Optional[str] = None) -> Iterable[Dict[str, Any]]:
+        """Yield stored records, optionally filtered by log_date range and meal type."""
+        self.flush()
+        where, params = [], []
+        if start is not None:
+            where.append('log_date >= ?')
+            params.append(start)
+        if end is not None:
+            where.append('log_date <= ?')
+            params.append(end)
+        if meal_type is not None:
+            where.append('meal_type = ?')
+            params.append(meal_type)
+        cols = self._columns[kind]
+        sql = f'SELECT {", ".join(cols)}, extra FROM {STORE_TABLES[kind]["table"]}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        if 'log_date' in cols:
+            sql += ' ORDER BY log_date, rowid'
+        for row in self.conn.execute(sql, params):
+            yield self._decode(kind, row)
+
+    def load(self, kind: str, start: Optional[str] = None, end: Optional[str] = None,
+             meal_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_load(kind, start, end, meal_type))
+
+    def page(self, kind: str, cursor: Optional[str] = None, limit: int = 20,
+             order: str = 'recent') -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Descending page of ``kind`` in one of its ``orders``; returns ``(records, next_cursor)``.
+
+        'recent' is newest first; posts also have 'top', most liked first
+        with ties newest first. The cursor holds the last row's sort values,
+        so each page is a few index seeks however deep the user scrolls, and
+        a like only moves one index entry. Rows without an order value come
+        last; tables without a key break ties on rowid. Raises ValueError for
+        an unknown order or a cursor this order didn't produce.
+        """
+        self.flush()
+        terms = _order_terms(kind, order)
+        cols = ', '.join(terms + self._columns[kind])
+        select = f'SELECT {cols}, extra FROM {STORE_TABLES[kind]["table"]}'
+        if cursor is None:
+            sql = f'{select} ORDER BY {", ".join(t + " DESC" for t in terms)} LIMIT ?'
+            rows = self.conn.execute(sql, (limit + 1,)).fetchall()
+        else:
+            after = self._cursor_values(cursor, len(terms))
+            rows = []
+            # One seek per tie level: rows equal to the cursor on the first i terms and below it on the next
+            for i in range(len(terms) - 1, -1, -1):
+                where = ' AND '.join([f'{t} = ?' for t in terms[:i]] + [f'{terms[i]} < ?'])
+                sql = f'{select} WHERE {where} ORDER BY {", ".join(t + " DESC" for t in terms[i:])} LIMIT ?'
+                rows += self.conn.execute(sql, after[:i + 1] + [limit + 1 - len(rows)]).fetchall()
+                if len(rows) > limit:
+                    break
+        records = [self._decode(kind, row[len(terms):]) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return records, None
+        return records, json.dumps(rows[limit - 1][:len(terms)])
+
+    @staticmethod
+    def _cursor_values(cursor: str, size: int) -> List[Any]:
+        try:
+            values = json.loads(cursor)
+        except (TypeError, ValueError):
+            values = None
+        if (not isinstance(values, list) or len(values) != size
+                or not all(isinstance(v, (str, int, float)) for v in values)):
+            raise ValueError(f'invalid page cursor: {cursor!r}')
+        return values
+
+    def load_columns(self, kind: str, start: Optional[str] = None, end: Optional[str] = None) -> LogColumns:
+        return LogColumns(STORE_TABLES[kind]['schema'], self.iter_load(kind, start, end))
+
+    def append_op(self, op: Dict[str, Any]) -> None:
+        """Queue one operation-log entry (see ``OpLog``) with the other batched writes."""
+        self._pending.setdefault('op', []).append((op['seq'], op['kind'], json.dumps(op['key']), op['op'],
+                                                   op.get('field'), json.dumps(op.get('value')), op['ts']))
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+
+    def load_ops(self, after: int = 0) -> List[Dict[str, Any]]:
+        self.flush()
+        rows = self.conn.execute('SELECT seq, kind, record_key, op, field, value, ts FROM op_log '
+                                 'WHERE seq > ? ORDER BY seq', (after,))
+        return [{'seq': seq, 'kind': kind, 'key': json.loads(key), 'op': op, 'field': field,
+                 'value': json.loads(value), 'ts': ts} for seq, kind, key, op, field, value, ts in rows]
+
+    def prune_ops(self, upto: int) -> None:
+        self.flush()
+        with self.conn:
+            self.conn.execute('DELETE FROM op_log WHERE seq <= ?', (upto,))
+
+    def get_state(self, name: str, default: Any = None) -> Any:
+        row = self.conn.execute('SELECT value FROM sync_state WHERE name = ?', (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, name: str, value: Any) -> None:
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)',
+                              (name, json.dumps(value)))
+
+    def save_profile(self, profile: Dict[str, Any]) -> None:
+        self.flush()
+        with self.conn:
+            self.conn.execute('DELETE FROM user_profile')
+            self.conn.execute(self._sql['profile'], self._encode('profile', profile))
+
+    def load_profile(self) -> Optional[Dict[str, Any]]:
+        profiles = self.load('profile')
+        return profiles[0] if profiles else None
+
+    def delete(self, kind: str, key: Any) -> None:
+        """Delete the ``kind`` record whose key column equals ``key``; keyless kinds raise ValueError."""
+        spec = STORE_TABLES[kind]
+        if not spec['key']:
+            raise ValueError(f'{kind} records have no key column to delete by')
+        self.flush()
+        with self.conn:
+            self.conn.execute(f'DELETE FROM {spec["table"]} WHERE {spec["key"]} = ?', (key,))
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self) -> 'LocalStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ----------------------------- Import / Export --------------------------
+LOG_KINDS = {'meal': 'MealLog', 'daily': 'DailyLog'}
+
+
+def _file_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    lowered = path.lower()
+    if lowered.endswith('.ffsnap'):
+        return 'snapshot'
+    return 'csv' if lowered.endswith('.csv') else 'jsonl'
+
+
+def _csv_value(spec: Dict[str, Any], text: str) -> Any:
+    t = spec.get('type')
+    if t == 'number':
+        number = float(text)
+        return int(number) if number.is_integer() and '.' not in text else number
+    if t in ('array', 'object'):
+        return json.loads(text)
+    if t == 'boolean':
+        return text.lower() in ('1', 'true', 'yes')
+    return text
+
+
+def _parse_records(path: str, kind: str, fmt: Optional[str] = None) -> Iterable[Tuple[int, Any, Optional[str]]]:
+    """Yield ``(line, record, error)`` per record; a record that fails to parse has ``error`` set instead."""
+    props = STORE_TABLES[kind]['schema']['properties']
+    if _file_format(path, fmt) == 'snapshot':
+        with open_snapshot(path) as snap:
+            if snap.schema is not STORE_TABLES[kind]['schema']:
+                raise ValueError(f"{path} holds {snap.schema['name']} records, not {LOG_KINDS[kind]}")
+            for i in range(len(snap)):
+                yield i + 1, snap.row(i), None
+        return
+    with open(path, newline='', encoding='utf-8') as fh:
+        if _file_format(path, fmt) == 'csv':
+            reader = csv.DictReader(fh)
+            for row in reader:
+                try:
+                    yield reader.line_num, {k: _csv_value(props.get(k, {}), v)
+                                            for k, v in row.items() if v not in (None, '')}, None
+                except ValueError as exc:
+                    yield reader.line_num, None, f'unreadable value: {exc}'
+        else:
+            for number, line in enumerate(fh, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line), None
+                    except ValueError as exc:
+                        yield number, None, f'invalid JSON: {exc}'
+
+
+def iter_records(path: str, kind: str, fmt: Optional[str] = None) -> Iterable[Dict[str, Any]]:
+    """Yield records from a JSONL, CSV or snapshot file one at a time; raises ValueError on an unparsable line."""
+    for number, record, error in _parse_records(path, kind, fmt):
+        if error is not None:
+            raise ValueError(f'{path}:{number}: {error}')
+        yield record
+
+
+def write_records(records: Iterable[Dict[str, Any]], path: str, kind: str, fmt: Optional[str] = None) -> int:
+    """Stream records to a JSONL, CSV or snapshot file; returns the number written.
+
+    CSV files get one column per schema property with arrays JSON-encoded;
+    fields outside the schema are only kept in JSONL and snapshots.
+    """
+    if _file_format(path, fmt) == 'snapshot':
+        return write_snapshot(records, path, STORE_TABLES[kind]['schema'])
+    props = STORE_TABLES[kind]['schema']['properties']
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        if _file_format(path, fmt) == 'csv':
+            writer = csv.DictWriter(fh, fieldnames=list(props), extrasaction='ignore')
+            writer.writeheader()
+            for record in _plain(records):
+                writer.writerow({k: json.dumps(v) if isinstance(v, (list, dict)) else v
+                                 for k, v in record.items()})
+                count += 1
+        else:
+            for record in _plain(records):
+                fh.write(json.dumps(record))
+                fh.write('\n')
+                count += 1
+    return count
+
+
+def import_logs(path: str, kind: str, store: LocalStore, fmt: Optional[str] = None) -> Dict[str, Any]:
+    """Stream a log file into ``store`` with schema defaults filled in.
+
+    Records are validated and queued one by one, so memory stays flat
+    regardless of file size. Lines that fail to parse or validate are
+    skipped and reported in ``errors`` as ``(line, messages)`` (first 100).
+    Returns counts and records/second.
+    """
+    validate = validator_for(LOG_KINDS[kind]).validate
+    started = time.perf_counter()
+    read = imported = 0
+    rejected = []
+    for number, record, error in _parse_records(path, kind, fmt):
+        read += 1
+        if error is not None:
+            if len(rejected) < 100:
+                rejected.append((number, [error]))
+            continue
+        result = validate(record)
+        if result['valid']:
+            store.put(kind, result['record'])
+            imported += 1
+        elif len(rejected) < 100:
+            rejected.append((number, [f'missing {k}' for k in result['missing']] + result['errors']))
+    store.flush()
+    elapsed = time.perf_counter() - started
+    return {'read': read, 'imported': imported, 'rejected': read - imported, 'errors': rejected,
+            'seconds': elapsed, 'records_per_sec': read / elapsed if elapsed else 0.0}
+
+
+def export_logs(store: LocalStore, kind: str, path: str, fmt: Optional[str] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    written = write_records(store.iter_load(kind), path, kind, fmt)
+    elapsed = time.perf_counter() - started
+    return {'written': written, 'seconds': elapsed, 'records_per_sec': written / elapsed if elapsed else 0.0}
+
+
+# ----------------------------- Network Sync -----------------------------
+# asyncio is imported inside the functions below: it costs more to import
+# than the rest of this module, and most runs never sync.
+# Field that identifies a record for coalescing pending writes; records
+# without it (or kinds mapped to None) are never coalesced.
+SYNC_KEYS = {'meal': 'id', 'daily': 'log_date', 'post': 'id', 'profile': None, 'workout_plan': 'plan_name',
+             'body': 'log_date'}
+
+
+class SyncError(Exception):
+    """Retryable sync failure (connection error or 5xx response)."""
+
+
+async def _read_http_message(reader: 'asyncio.StreamReader') -> Tuple[str, Dict[str, str], bytes]:
+    start = await reader.readline()
+    if not start:
+        raise ConnectionError('connection closed')
+    return await _read_http_rest(reader, start)
+
+
+async def _read_http_rest(reader: 'asyncio.StreamReader', start: bytes) -> Tuple[str, Dict[str, str], bytes]:
+    """Headers and body of a message whose start line has already been read."""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return start.decode('latin-1').strip(), headers, body
+
+
+def _http_message(start: str, payload: Any = None, headers: Optional[Dict[str, str]] = None) -> bytes:
+    body = json.dumps(payload).encode() if payload is not None else b''
+    lines = [start, f'Content-Length: {len(body)}', 'Content-Type: application/json', 'Connection: keep-alive']
+    lines += [f'{k}: {v}' for k, v in (headers or {}).items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+class ConnectionPool:
+    """Pool of keep-alive HTTP/1.1 connections to one host.
+
+    At most ``size`` requests are in flight; idle connections are reused
+    most-recently-used first and dropped after any error. A reused
+    connection that fails before any response arrives was most likely
+    closed by the server while idle, so the request is retried once on a
+    new connection.
+    """
+
+    def __init__(self, host: str, port: int, size: int = 4, use_ssl: bool = False, timeout: float = 10.0):
+        import asyncio
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self._idle: List[Tuple['asyncio.StreamReader', 'asyncio.StreamWriter']] = []
+        self._slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def request(self, method: str, path: str, payload: Any = None) -> Tuple[int, Any]:
+        import asyncio
+        message = _http_message(f'{method} {path} HTTP/1.1', payload, {'Host': self.host})
+        async with self._slots:
+            fresh = False
+            while True:
+                reused = not fresh and bool(self._idle)
+                if reused:
+                    conn = self._idle.pop()
+                else:
+                    conn = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port, ssl=self.use_ssl or None), self.timeout)
+                    self.opened += 1
+                reader, writer = conn
+                received = False
+
+                async def exchange() -> Tuple[str, Dict[str, str], bytes]:
+                    nonlocal received
+                    writer.write(message)
+                    await writer.drain()
+                    start = await reader.readline()
+                    if not start:
+                        raise ConnectionError('connection closed')
+                    received = True
+                    return await _read_http_rest(reader, start)
+
+                try:
+                    status_line, headers, body = await asyncio.wait_for(exchange(), self.timeout)
+                except ConnectionError:
+                    writer.close()
+                    if reused and not received:
+                        # The other idle connections are likely just as stale
+                        await self.close()
+                        fresh = True
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                break
+            if headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self._idle.append(conn)
+            return int(status_line.split()[1]), json.loads(body) if body else None
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class SyncClient:
+    """Asyncio client that pushes and pulls FitFlow records.
+
+    ``queue_write`` only records the write: later writes to the same record
+    (see ``SYNC_KEYS``) replace earlier pending ones, and ``run`` flushes
+    pending writes in batches every ``flush_interval`` seconds or as soon as
+    a batch fills. Failed batches are retried with jittered exponential
+    backoff. Each batch outcome is passed to ``on_result``.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 4, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_retries: int = 4, backoff: float = 0.25,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        import asyncio
+        url = urlsplit(base_url)
+        use_ssl = url.scheme == 'https'
+        self.prefix = url.path.rstrip('/')
+        self.pool = ConnectionPool(url.hostname, url.port or (443 if use_ssl else 80), pool_size, use_ssl)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_result = on_result
+        self._pending: Dict[str, 'OrderedDict[Any, Dict[str, Any]]'] = {}
+        self._pending_count = 0
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._closed = False
+
+    def queue_write(self, kind: str, record: Dict[str, Any]) -> None:
+        if isinstance(record, Record):
+            record = record.to_dict()
+        pending = self._pending.setdefault(kind, OrderedDict())
+        field = SYNC_KEYS[kind]
+        if kind == 'profile':
+            key = 'profile'
+        elif field and record.get(field) is not None:
+            key = record[field]
+        else:
+            key = next(self._seq)
+        if key in pending:
+            pending[key].update(record)
+        else:
+            pending[key] = dict(record)
+            self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self._wake.set()
+
+    async def _send(self, kind: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        import asyncio
+        result = {'kind': kind, 'count': len(records), 'ok': False, 'attempts': 0, 'status': None, 'error': None}
+        for attempt in range(self.max_retries + 1):
+            result['attempts'] = attempt + 1
+            try:
+                status, _ = await self.pool.request('POST', f'{self.prefix}/sync/{kind}', {'records': records})
+                result['status'] = status
+                if status >= 500:
+                    raise SyncError(f'server returned {status}')
+                result['ok'] = status < 400
+                result['error'] = None if result['ok'] else f'server returned {status}'
+                break
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, SyncError) as exc:
+                result['error'] = str(exc) or type(exc).__name__
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.0))
+        if self.on_result is not None:
+            self.on_result(result)
+        return result
+
+    async def flush(self) -> List[Dict[str, Any]]:
+        """Send every pending write now, one request per batch, concurrently."""
+        import asyncio
+        pending, self._pending = self._pending, {}
+        self._pending_count = 0
+        self._wake.clear()
+        sends = []
+        for kind, records in pending.items():
+            records = list(records.values())
+            for i in range(0, len(records), self.batch_size):
+                sends.append(self._send(kind, records[i:i + self.batch_size]))
+        return list(await asyncio.gather(*sends))
+
+    async def push_deltas(self, deltas: Dict[str, List[Dict[str, Any]]]) -> bool:
+        """Send compacted ``OpLog`` deltas; True only if every batch was accepted."""
+        import asyncio
+        sends = []
+        for kind, records in deltas.items():
+            for i in range(0, len(records), self.batch_size):
+                sends.append(self._send(kind, records[i:i + self.batch_size]))
+        results = await asyncio.gather(*sends)
+        return all(r['ok'] for r in results)
+
+    async def pull(self, kind: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        path = f'{self.prefix}/sync/{kind}' + (f'?since={since}' if since else '')
+        status, data = await self.pool.request('GET', path)
+        if status >= 400:
+            raise SyncError(f'server returned {status}')
+        # An empty or malformed body means nothing to pull, not a crash
+        return data.get('records', []) if isinstance(data, dict) else []
+
+    async def check_auth(self) -> Dict[str, Any]:
+        status, data = await self.pool.request('GET', f'{self.prefix}/auth')
+        return data if status < 400 and data else {'authenticated': False}
+
+    async def run(self) -> None:
+        """Flush loop; returns after ``close``."""
+        import asyncio
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._pending_count:
+                await self.flush()
+
+    async def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        if self._pending_count:
+            await self.flush()
+        await self.pool.close()
+
+
+class SyncWorker:
+    """Runs a SyncClient on its own thread so the UI thread never waits on the network.
+
+    ``deliver`` is called with a zero-argument function that must be run on
+    the UI thread (in the app, a ``Clock.schedule_once`` wrapper); batch
+    results and ``submit`` callbacks reach the UI through it.
+    """
+
+    def __init__(self, base_url: str, deliver: Optional[Callable[[Callable[[], None]], None]] = None,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None, **client_kwargs):
+        import asyncio
+        self.deliver = deliver or (lambda fn: fn())
+        self.on_result = on_result
+        self.pushing = False
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='fitflow-sync', daemon=True)
+        self.thread.start()
+
+        async def start():
+            client = SyncClient(base_url, on_result=self._result, **client_kwargs)
+            self._runner = asyncio.ensure_future(client.run())
+            return client
+
+        self.client = asyncio.run_coroutine_threadsafe(start(), self.loop).result()
+
+    def _result(self, result: Dict[str, Any]) -> None:
+        if self.on_result is not None:
+            self.deliver(lambda: self.on_result(result))
+
+    def queue_write(self, kind: str, record: Dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self.client.queue_write, kind, record_dict(record))
+
+    def submit(self, coro: Any, callback: Optional[Callable[[Any], None]] = None) -> 'concurrent.futures.Future':
+        """Run ``coro`` on the sync loop; ``callback(future)`` is delivered to the UI thread."""
+        import asyncio
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if callback is not None:
+            future.add_done_callback(lambda f: self.deliver(lambda: callback(f)))
+        return future
+
+    def pull(self, kind: str, callback: Callable[[Any], None], since: Optional[str] = None):
+        return self.submit(self.client.pull(kind, since), callback)
+
+    def flush(self):
+        return self.submit(self.client.flush())
+
+    def push_deltas(self, oplog: 'OpLog', callback: Optional[Callable[[bool], None]] = None):
+        """Upload ``oplog``'s compacted deltas and checkpoint it once accepted.
+
+        Compaction and the checkpoint both run on the calling (UI) thread,
+        so the op log and its store are never touched from the sync thread.
+        Only one push runs at a time: a call made while one is in flight
+        returns None, and ops recorded meanwhile go up in a follow-up push
+        once it succeeds.
+        """
+        if self.pushing:
+            return None
+        deltas, upto = oplog.deltas()
+        if not deltas:
+            return None
+        self.pushing = True
+
+        def done(future):
+            self.pushing = False
+            ok = not future.cancelled() and future.exception() is None and future.result()
+            if ok:
+                oplog.checkpoint(upto)
+                if oplog.seq > upto:
+                    self.push_deltas(oplog)
+            if callback is not None:
+                callback(ok)
+
+        return self.submit(self.client.push_deltas(deltas), done)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush pending writes and stop the loop thread."""
+        import asyncio
+        async def shutdown():
+            await self.client.close()
+            await self._runner
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+
+
+class LocalSyncServer:
+    """In-memory stand-in for the sync backend, for local runs and tests.
+
+    Serves ``GET /auth``, ``POST /sync/<kind>`` (upserts by ``SYNC_KEYS``,
+    applying ``OpLog`` patches and deletes) and
+    ``GET /sync/<kind>?since=YYYY-MM-DD`` over keep-alive HTTP/1.1.
+    ``fail_first`` makes the first N pushes answer 503 to exercise retries,
+    and ``keep_alive=False`` drops each connection after one response
+    without saying so, as servers reaping idle connections do.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, fail_first: int = 0, keep_alive: bool = True):
+        self.host = host
+        self.port = port
+        self.fail_first = fail_first
+        self.keep_alive = keep_alive
+        self.records: Dict[str, 'OrderedDict[Any, Dict[str, Any]]'] = {kind: OrderedDict() for kind in SYNC_KEYS}
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+        self._clients: Dict['asyncio.StreamWriter', 'asyncio.Task'] = {}
+        self._seq = itertools.count()
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    async def start(self) -> 'LocalSyncServer':
+        import asyncio
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        import asyncio
+        self._server.close()
+        tasks = list(self._clients.values())
+        for writer in list(self._clients):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: 'asyncio.StreamReader', writer: 'asyncio.StreamWriter') -> None:
+        import asyncio
+        from http import HTTPStatus
+        self.connections += 1
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    start, _, body = await _read_http_message(reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                self.requests += 1
+                method, target, _ = start.split(' ', 2)
+                status, payload = self._route(method, urlsplit(target), json.loads(body) if body else None)
+                writer.write(_http_message(f'HTTP/1.1 {status} {HTTPStatus(status).phrase}', payload))
+                await writer.drain()
+                if not self.keep_alive:
+                    break
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    def _route(self, method: str, url, body: Any) -> Tuple[int, Any]:
+        parts = url.path.strip('/').split('/')
+        if parts == ['auth']:
+            return 200, {'authenticated': True, 'redirect': 'Dashboard'}
+        if len(parts) != 2 or parts[0] != 'sync' or parts[1] not in SYNC_KEYS:
+            return 404, {'error': 'not found'}
+        kind = parts[1]
+        store = self.records[kind]
+        if method == 'POST':
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return 503, {'error': 'unavailable'}
+            field = SYNC_KEYS[kind]
+            for record in body.get('records', []):
+                key = 'profile' if kind == 'profile' else record.get(field) if field else None
+                if key is None:
+                    store[next(self._seq)] = record
+                elif record.get('_deleted'):
+                    store.pop(key, None)
+                elif record.get('_op') == 'patch' and key in store:
+                    store[key].update((k, v) for k, v in record.items() if k != '_op')
+                else:
+                    store[key] = {k: v for k, v in record.items() if k != '_op'}
+            return 200, {'accepted': len(body.get('records', []))}
+        since = dict(p.split('=', 1) for p in url.query.split('&') if '=' in p).get('since')
+        records = [r for r in store.values() if not since or (r.get('log_date') or '') >= since]
+        return 200, {'records': records}
+
+
+# ----------------------------- Background Work --------------------------
+class ComputeScheduler:
+    """Runs computations on a thread pool and hands results back through ``deliver``.
+
+    Every request carries a tag (in the app, the tab that asked for it).
+    Cancelling a tag bumps its generation, so results of requests made
+    before the cancel are dropped even if they already finished; the check
+    is repeated when the result reaches the UI thread. A request counts as
+    outstanding until its delivery has run there, so ``cancel`` also
+    reports work whose result was still queued. ``deliver`` receives a
+    zero-argument function to run on the UI thread. A failure with no
+    ``on_error`` handler is logged rather than dropped.
+    """
+
+    def __init__(self, deliver: Optional[Callable[[Callable[[], None]], None]] = None, max_workers: int = 2):
+        import concurrent.futures
+        self.deliver = deliver or (lambda fn: fn())
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fitflow-compute')
+        self._lock = threading.Lock()
+        self._generation: Dict[str, int] = {}
+        self._futures: Dict[str, Set['concurrent.futures.Future']] = {}
+        self._outstanding: Dict[str, Set[object]] = {}
+
+    def _current(self, tag: str, generation: int) -> bool:
+        with self._lock:
+            return self._generation.get(tag, 0) == generation
+
+    def _finish(self, tag: str, token: object) -> None:
+        with self._lock:
+            tokens = self._outstanding.get(tag)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._outstanding[tag]
+
+    def submit(self, tag: str, fn: Callable[..., Any], *args: Any,
+               on_result: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None) -> 'concurrent.futures.Future':
+        token = object()
+        with self._lock:
+            generation = self._generation.get(tag, 0)
+            future = self.pool.submit(fn, *args)
+            self._futures.setdefault(tag, set()).add(future)
+            self._outstanding.setdefault(tag, set()).add(token)
+
+        def run(callback: Callable[[], None]) -> None:
+            try:
+                if self._current(tag, generation):
+                    callback()
+            finally:
+                self._finish(tag, token)
+
+        def done(f: 'concurrent.futures.Future') -> None:
+            with self._lock:
+                self._futures.get(tag, set()).discard(f)
+            if f.cancelled() or not self._current(tag, generation):
+                self._finish(tag, token)
+                return
+            exc = f.exception()
+            callback = None
+            if exc is not None:
+                if on_error is not None:
+                    callback = lambda: on_error(exc)
+                else:
+                    logger.error('background task %r for %s failed', fn, tag, exc_info=exc)
+            elif on_result is not None:
+                result = f.result()
+                callback = lambda: on_result(result)
+            if callback is None:
+                self._finish(tag, token)
+            else:
+                self.deliver(lambda: run(callback))
+
+        future.add_done_callback(done)
+        return future
+
+    def cancel(self, tag: str) -> bool:
+        """Drop every request for ``tag`` still running or awaiting delivery; True if there were any."""
+        with self._lock:
+            self._generation[tag] = self._generation.get(tag, 0) + 1
+            futures = self._futures.pop(tag, set())
+            outstanding = self._outstanding.pop(tag, set())
+        for future in futures:
+            future.cancel()
+        return bool(outstanding)
+
+    def cancel_except(self, tag: str) -> List[str]:
+        """Cancel requests for every other tag; returns the tags that lost work."""
+        with self._lock:
+            others = [t for t in self._outstanding if t != tag]
+        return [other for other in others if self.cancel(other)]
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            tags = list(self._outstanding)
+        for tag in tags:
+            self.cancel(tag)
+        self.pool.shutdown(wait=wait)
+
+
+# ----------------------------- Offline Op Log ---------------------------
+class OpLog:
+    """Append-only log of field-level edits to daily and meal logs.
+
+    ``make_log``/``update_field`` (and the meal save path) append ``put``,
+    ``set`` and ``delete`` ops. ``deltas`` compacts everything since the
+    last checkpoint to one entry per record: a full record for new ones, a
+    ``'_op': 'patch'`` with just the changed fields otherwise, or a
+    ``'_deleted'`` marker. With a ``LocalStore`` the log survives restarts
+    and ops are pruned once checkpointed.
+    """
+
+    def __init__(self, store: Optional[LocalStore] = None):
+        self.store = store
+        self.checkpoint_seq = store.get_state('oplog_checkpoint', 0) if store else 0
+        self.ops: List[Dict[str, Any]] = store.load_ops(self.checkpoint_seq) if store else []
+        self.seq = self.ops[-1]['seq'] if self.ops else self.checkpoint_seq
+
+    def _key(self, kind: str, record: Dict[str, Any]) -> Any:
+        field = SYNC_KEYS[kind]
+        if record.get(field) is None:
+            record[field] = uuid.uuid4().hex
+        return record[field]
+
+    def _append(self, kind: str, key: Any, op: str, field: Optional[str] = None, value: Any = None) -> Dict[str, Any]:
+        self.seq += 1
+        entry = {'seq': self.seq, 'kind': kind, 'key': key, 'op': op, 'field': field, 'value': value, 'ts': time.time()}
+        self.ops.append(entry)
+        if self.store is not None:
+            self.store.append_op(entry)
+        return entry
+
+    def record_put(self, kind: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self._append(kind, self._key(kind, record), 'put', value=record_dict(record))
+
+    def record_set(self, kind: str, record: Dict[str, Any], field: str, value: Any) -> Dict[str, Any]:
+        return self._append(kind, self._key(kind, record), 'set', field, value)
+
+    def record_delete(self, kind: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self._append(kind, self._key(kind, record), 'delete')
+
+    def deltas(self) -> Tuple[Dict[str, List[Dict[str, Any]]], int]:
+        """Compact pending ops into per-kind upload records; returns them with the last seq covered."""
+        state: 'OrderedDict[Tuple[str, Any], Dict[str, Any]]' = OrderedDict()
+        for op in self.ops:
+            slot = (op['kind'], op['key'])
+            field = SYNC_KEYS[op['kind']]
+            if op['op'] == 'put':
+                state[slot] = dict(op['value'], **{field: op['key']})
+            elif op['op'] == 'delete':
+                state[slot] = {field: op['key'], '_deleted': True}
+            else:
+                current = state.get(slot)
+                if current is None or current.get('_deleted'):
+                    current = state[slot] = {field: op['key'], '_op': 'patch'}
+                current[op['field']] = op['value']
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for (kind, _), record in state.items():
+            out.setdefault(kind, []).append(record)
+        return out, self.seq
+
+    def checkpoint(self, upto: int) -> None:
+        """Drop ops up to ``upto`` after they have been uploaded."""
+        self.ops = [op for op in self.ops if op['seq'] > upto]
+        self.checkpoint_seq = max(self.checkpoint_seq, upto)
+        if self.store is not None:
+            self.store.set_state('oplog_checkpoint', self.checkpoint_seq)
+            self.store.prune_ops(upto)
+
+
 # ----------------------------- Community --------------------------------
 def sample_posts() -> List[Dict[str, Any]]:
     """Return a small list of mock community posts."""
@@ -112,7 +1841,10 @@ def get_profile_stub() -> Dict[str, Any]:
     }
 
 
-def save_profile(data: Dict[str, Any]) -> Dict[str, Any]:
+def save_profile(data: Dict[str, Any], store: Optional[LocalStore] = None) -> Dict[str, Any]:
+    if store is not None:
+        store.save_profile(data)
+    profile_cache.update_profile(data)
     return {'status': 'ok', 'saved': data}
 
 
@@ -122,14 +1854,18 @@ def sample_insights() -> Dict[str, Any]:
         'overallScore': 78,
         'topRecommendation': 'Increase sleep to 7-8 hours/night',
         'insights': [
-            {'title': 'Sleep vs Performance', 'description': 'Better sleep correlates with more workouts', 'type': 'correlation'},
+            {'title': 'Sleep vs Performance', 'description': 'Better sleep correlates with more workouts',
+             'type': 'correlation'},
             {'title': 'Hydration', 'description': 'Average water is low, aim for +2 glasses', 'type': 'suggestion'}
         ]
     }
 
 
 # ----------------------------- Nutrition --------------------------------
-def compute_daily_totals(meal_logs: List[Dict[str, Any]]) -> Dict[str, float]:
+def compute_daily_totals(meal_logs: Union[List[Dict[str, Any]], LogColumns]) -> Dict[str, float]:
+    if isinstance(meal_logs, LogColumns):
+        sums = meal_logs.sums(['total_calories', 'total_protein', 'total_carbs', 'total_fat'])
+        return {k[len('total_'):]: v for k, v in sums.items()}
     totals = {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0}
     for meal in meal_logs:
         totals['calories'] += meal.get('total_calories', 0)
@@ -139,29 +1875,601 @@ def compute_daily_totals(meal_logs: List[Dict[str, Any]]) -> Dict[str, float]:
     return totals
 
 
+_MACRO_KEYS = (('calories', 'total_calories'), ('protein', 'total_protein'),
+               ('carbs', 'total_carbs'), ('fat', 'total_fat'))
+_MACRO_CALS = (('protein', 4), ('carbs', 4), ('fat', 9))
+
+
+class NutritionTotals:
+    """Running per-day nutrition totals updated in O(1) per meal change.
+
+    Keeps the same numbers as ``compute_daily_totals`` and ``macro_breakdown``
+    over each day's meals, without rescanning the day when a meal is added,
+    edited or deleted.
+    """
+
+    def __init__(self, meal_logs: Optional[Iterable[Dict[str, Any]]] = None):
+        self._meals: Dict[int, Dict[str, Any]] = {}
+        self._days: Dict[str, Dict[str, float]] = {}
+        self._next_id = 0
+        for meal in meal_logs or ():
+            self.add_meal(meal)
+
+    def _apply(self, meal: Dict[str, Any], sign: int) -> None:
+        day = self._days.get(meal.get('log_date'))
+        if day is None:
+            day = self._days[meal.get('log_date')] = {
+                'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0,
+                'protein_cals': 0.0, 'carbs_cals': 0.0, 'fat_cals': 0.0, 'meals': 0
+            }
+        for key, field in _MACRO_KEYS:
+            day[key] += sign * meal.get(field, 0)
+        for key, factor in _MACRO_CALS:
+            day[key + '_cals'] += sign * factor * meal.get('total_' + key, 0)
+        day['meals'] += sign
+        if not day['meals']:
+            del self._days[meal.get('log_date')]
+
+    def add_meal(self, meal: Dict[str, Any]) -> int:
+        """Record ``meal`` and return the id used to edit or delete it later."""
+        meal_id = self._next_id
+        self._next_id += 1
+        self._meals[meal_id] = dict(meal)
+        self._apply(meal, 1)
+        return meal_id
+
+    def update_meal(self, meal_id: int, meal: Dict[str, Any]) -> None:
+        self._apply(self._meals[meal_id], -1)
+        self._meals[meal_id] = dict(meal)
+        self._apply(meal, 1)
+
+    def remove_meal(self, meal_id: int) -> Dict[str, Any]:
+        meal = self._meals.pop(meal_id)
+        self._apply(meal, -1)
+        return meal
+
+    def totals(self, log_date: str) -> Dict[str, float]:
+        day = self._days.get(log_date)
+        if day is None:
+            return {'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fat': 0.0}
+        return {key: day[key] for key, _ in _MACRO_KEYS}
+
+    def breakdown(self, log_date: str) -> Dict[str, float]:
+        day = self._days.get(log_date)
+        if day is None:
+            return {'protein': 0, 'carbs': 0, 'fat': 0, 'total_calories': 0}
+        out = {key: day[key + '_cals'] for key, _ in _MACRO_CALS}
+        out['total_calories'] = out['protein'] + out['carbs'] + out['fat']
+        return out
+
+
 # ----------------------------- Add Meal ---------------------------------
-FOOD_DATABASE = [
-    {'name': 'Chicken Breast', 'calories': 165, 'protein': 31},
-    {'name': 'Brown Rice', 'calories': 216, 'protein': 5},
-    {'name': 'Salmon', 'calories': 208, 'protein': 20}
+class FoodList(list):
+    """List that counts its own mutations so ``food_index`` knows when to rebuild.
+
+    Every list operation that adds, removes, replaces or reorders items bumps
+    ``version``; editing a food dict in place does not, so replace the item
+    (``FOOD_DATABASE[i] = {...}``) instead.
+    """
+
+    version = 0
+
+
+def _counting(method: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend',
+              'insert', 'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(FoodList, _name, _counting(getattr(list, _name)))
+del _name
+
+
+FOOD_DATABASE = FoodList([
+    {'name': 'Chicken Breast', 'calories': 165, 'protein': 31, 'carbs': 0, 'fat': 4},
+    {'name': 'Brown Rice', 'calories': 216, 'protein': 5, 'carbs': 45, 'fat': 2},
+    {'name': 'Salmon', 'calories': 208, 'protein': 20, 'carbs': 0, 'fat': 13}
+])
+
+
+class FoodIndex:
+    """In-memory n-gram index over food names with ranked substring search.
+
+    Every lowercased name is indexed by its 1-, 2- and 3-grams. Queries of up
+    to three characters are answered straight from a posting set; longer
+    queries intersect their trigram postings and verify the survivors, so
+    the matches are exactly those of a plain substring test. Doc ids only
+    ever increase, so they double as insertion order; removed slots are
+    reclaimed by renumbering once they make up most of the index.
+    """
+
+    def __init__(self, foods: Optional[List[Dict[str, Any]]] = None):
+        self._foods: List[Optional[Dict[str, Any]]] = []
+        self._names: List[Optional[str]] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        self._size = 0
+        for food in foods or []:
+            self.insert(food)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        grams = set()
+        for n in (1, 2, 3):
+            for i in range(len(text) - n + 1):
+                grams.add(text[i:i + n])
+        return grams
+
+    def insert(self, food: Dict[str, Any]) -> int:
+        name = food['name'].lower()
+        doc = len(self._foods)
+        self._foods.append(food)
+        self._names.append(name)
+        for gram in self._grams(name):
+            self._postings.setdefault(gram, set()).add(doc)
+        self._by_name.setdefault(name, []).append(doc)
+        self._size += 1
+        return doc
+
+    def named(self, name: str) -> List[Dict[str, Any]]:
+        """Every indexed food called ``name`` (case-insensitive), in insertion order."""
+        return [self._foods[doc] for doc in self._by_name.get(name.lower(), ())]
+
+    def remove(self, name: str) -> int:
+        """Remove every food called ``name`` (case-insensitive); return the count."""
+        key = name.lower()
+        docs = self._by_name.pop(key, [])
+        grams = self._grams(key)
+        for doc in docs:
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(doc)
+                    if not posting:
+                        del self._postings[gram]
+            self._foods[doc] = None
+            self._names[doc] = None
+        self._size -= len(docs)
+        if len(self._foods) > 64 and self._size < len(self._foods) // 2:
+            self._compact()
+        return len(docs)
+
+    def _compact(self) -> None:
+        """Rebuild without removed slots; survivors keep their relative order."""
+        foods = [f for f in self._foods if f is not None]
+        self._foods, self._names, self._postings, self._by_name, self._size = [], [], {}, {}, 0
+        for food in foods:
+            self.insert(food)
+
+    def _candidates(self, q: str) -> Iterable[int]:
+        if not q:
+            return (doc for doc, name in enumerate(self._names) if name is not None)
+        if len(q) <= 3:
+            return self._postings.get(q, ())
+        postings = []
+        for i in range(len(q) - 2):
+            posting = self._postings.get(q[i:i + 3])
+            if not posting:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        docs = set(postings[0])
+        for posting in postings[1:]:
+            docs &= posting
+            if not docs:
+                return ()
+        names = self._names
+        return (doc for doc in docs if q in names[doc])
+
+    def _rank(self, doc: int, q: str):
+        name = self._names[doc]
+        if name == q:
+            tier = 0
+        elif name.startswith(q):
+            tier = 1
+        elif (' ' + q) in name:
+            tier = 2
+        else:
+            tier = 3
+        return (tier, len(name), doc)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return foods whose name contains ``query``, best matches first.
+
+        Exact names rank first, then prefixes, then word prefixes, then any
+        other substring; ties go to the shorter name, then insertion order.
+        """
+        q = query.lower().strip()
+        keyed = ((self._rank(doc, q), doc) for doc in self._candidates(q))
+        if limit is None:
+            ranked = sorted(keyed)
+        else:
+            ranked = heapq.nsmallest(limit, keyed)
+        return [self._foods[doc] for _, doc in ranked]
+
+
+_food_index: Optional[FoodIndex] = None
+_food_index_source: Tuple[Optional[FoodList], int] = (None, -1)
+
+
+def food_index() -> FoodIndex:
+    """Return the shared index over ``FOOD_DATABASE``, rebuilding it whenever the list was mutated or replaced.
+
+    Raises TypeError if ``FOOD_DATABASE`` was rebound to a plain list, whose
+    mutations the index couldn't see.
+    """
+    global _food_index, _food_index_source
+    if not isinstance(FOOD_DATABASE, FoodList):
+        raise TypeError(f'FOOD_DATABASE must be a FoodList, not {type(FOOD_DATABASE).__name__}; '
+                        'wrap it with FoodList(...) or change it through add_food/remove_food')
+    source, version = _food_index_source
+    if _food_index is None or source is not FOOD_DATABASE or version != FOOD_DATABASE.version:
+        _food_index = FoodIndex(FOOD_DATABASE)
+        _food_index_source = (FOOD_DATABASE, FOOD_DATABASE.version)
+    return _food_index
+
+
+MEAL_TYPES = ('breakfast', 'lunch', 'dinner', 'snack')
+
+
+def meal_type_for(moment: Optional[datetime] = None) -> str:
+    """Most likely meal type for a meal logged at ``moment`` (default: now)."""
+    hour = (moment or datetime.now()).hour
+    if 5 <= hour < 11:
+        return 'breakfast'
+    if 11 <= hour < 15:
+        return 'lunch'
+    if 17 <= hour < 22:
+        return 'dinner'
+    return 'snack'
+
+
+def add_food(food: Dict[str, Any]) -> None:
+    global _food_index_source
+    index = food_index()
+    FOOD_DATABASE.append(food)
+    index.insert(food)
+    _food_index_source = (FOOD_DATABASE, FOOD_DATABASE.version)
+
+
+def remove_food(name: str) -> int:
+    """Remove every food called ``name`` (case-insensitive); returns the count.
+
+    The index finds the foods by name, so a miss leaves the list alone and
+    each hit is located with ``list.index`` instead of lowercasing every name.
+    """
+    global _food_index_source
+    index = food_index()
+    for food in index.named(name):
+        del FOOD_DATABASE[FOOD_DATABASE.index(food)]
+    removed = index.remove(name)
+    _food_index_source = (FOOD_DATABASE, FOOD_DATABASE.version)
+    return removed
+
+
+def search_foods(query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    return food_index().search(query, limit)
+
+
+# Per 100 g: name, calories, protein, carbs, fat, grams per serving, grams per cup, aliases.
+NUTRIENT_TABLE = [
+    ('Chicken Breast', 165, 31, 0, 3.6, 120, 140, ('chicken', 'chicken breasts')),
+    ('Chicken Thigh', 209, 26, 0, 10.9, 100, 140, ()),
+    ('Turkey Breast', 135, 30, 0, 1, 100, 140, ('turkey',)),
+    ('Ground Beef', 250, 26, 0, 15, 100, 150, ('beef', 'mince')),
+    ('Steak', 271, 25, 0, 19, 150, None, ()),
+    ('Salmon', 208, 20, 0, 13, 150, None, ()),
+    ('Tuna', 116, 26, 0, 0.8, 100, 150, ()),
+    ('Shrimp', 99, 24, 0.2, 0.3, 85, 145, ('prawn',)),
+    ('Egg', 143, 12.6, 0.7, 9.5, 50, 243, ('eggs',)),
+    ('Tofu', 76, 8, 1.9, 4.8, 126, 250, ()),
+    ('Brown Rice', 111, 2.6, 23, 0.9, 195, 195, ()),
+    ('White Rice', 130, 2.7, 28, 0.3, 158, 158, ('rice',)),
+    ('Quinoa', 120, 4.4, 21, 1.9, 185, 185, ()),
+    ('Pasta', 158, 5.8, 31, 0.9, 140, 140, ('spaghetti', 'noodle')),
+    ('Oats', 389, 16.9, 66, 6.9, 40, 80, ('rolled oats', 'oat')),
+    ('Oatmeal', 71, 2.5, 12, 1.5, 234, 234, ('porridge',)),
+    ('Granola', 471, 10, 64, 20, 60, 120, ()),
+    ('Whole Wheat Bread', 247, 13, 41, 3.4, 32, None, ('bread', 'toast', 'wholemeal bread')),
+    ('White Bread', 265, 9, 49, 3.2, 25, None, ()),
+    ('Bagel', 250, 10, 49, 1.5, 105, None, ()),
+    ('Tortilla', 304, 8, 50, 8, 45, None, ('wrap',)),
+    ('Pancake', 227, 6.4, 28, 9.7, 77, None, ()),
+    ('Potato', 93, 2.5, 21, 0.1, 173, 150, ('potatoes',)),
+    ('Sweet Potato', 90, 2, 21, 0.2, 130, 200, ('yam',)),
+    ('French Fries', 312, 3.4, 41, 15, 117, None, ('fries', 'chips')),
+    ('Lentils', 116, 9, 20, 0.4, 198, 198, ('lentil', 'dal')),
+    ('Black Beans', 132, 8.9, 24, 0.5, 172, 172, ('beans', 'bean')),
+    ('Broccoli', 34, 2.8, 7, 0.4, 91, 91, ()),
+    ('Spinach', 23, 2.9, 3.6, 0.4, 30, 30, ()),
+    ('Green Salad', 15, 1.4, 2.9, 0.2, 100, 50, ('salad', 'lettuce')),
+    ('Avocado', 160, 2, 8.5, 14.7, 150, 150, ('guacamole',)),
+    ('Banana', 89, 1.1, 23, 0.3, 118, 150, ()),
+    ('Apple', 52, 0.3, 14, 0.2, 182, 125, ()),
+    ('Orange', 47, 0.9, 12, 0.1, 131, 180, ()),
+    ('Blueberries', 57, 0.7, 14, 0.3, 148, 148, ('berries', 'blueberry')),
+    ('Strawberries', 32, 0.7, 7.7, 0.3, 152, 152, ('strawberry',)),
+    ('Milk', 61, 3.2, 4.8, 3.3, 244, 244, ()),
+    ('Greek Yogurt', 59, 10, 3.6, 0.4, 170, 245, ('yogurt', 'yoghurt')),
+    ('Cottage Cheese', 98, 11, 3.4, 4.3, 113, 226, ()),
+    ('Cheddar Cheese', 403, 25, 1.3, 33, 28, 113, ('cheese', 'cheddar')),
+    ('Butter', 717, 0.9, 0.1, 81, 14, 227, ()),
+    ('Olive Oil', 884, 0, 0, 100, 14, 216, ('oil',)),
+    ('Peanut Butter', 588, 25, 20, 50, 32, 258, ('pb',)),
+    ('Almonds', 579, 21, 22, 50, 28, 143, ('almond', 'nuts')),
+    ('Hummus', 166, 8, 14, 9.6, 30, 246, ()),
+    ('Honey', 304, 0.3, 82, 0, 21, 339, ()),
+    ('Dark Chocolate', 546, 4.9, 61, 31, 28, None, ('chocolate',)),
+    ('Whey Protein', 400, 80, 8, 6, 30, None, ('protein powder', 'protein shake', 'whey')),
+    ('Protein Bar', 350, 30, 40, 10, 60, None, ()),
+    ('Pizza', 266, 11, 33, 10, 107, None, ()),
+    ('Burger', 295, 17, 24, 14, 200, None, ('hamburger', 'cheeseburger')),
+    ('Orange Juice', 45, 0.7, 10, 0.2, 248, 248, ('juice', 'oj')),
+    ('Coffee', 1, 0.1, 0, 0, 240, 240, ()),
 ]
 
-
-def search_foods(query: str) -> List[Dict[str, Any]]:
-    q = query.lower().strip()
-    return [f for f in FOOD_DATABASE if q in f['name'].lower()]
+# Grams per unit; None means "per serving / per cup of this food".
+UNIT_GRAMS: Dict[str, Optional[float]] = {
+    'g': 1, 'gram': 1, 'gr': 1, 'kg': 1000, 'kilo': 1000, 'mg': 0.001,
+    'oz': 28.35, 'ounce': 28.35, 'lb': 453.6, 'lbs': 453.6, 'pound': 453.6,
+    'ml': 1, 'l': 1000, 'liter': 1000, 'litre': 1000,
+    'tbsp': 15, 'tablespoon': 15, 'tsp': 5, 'teaspoon': 5, 'scoop': 30,
+    'cup': None, 'serving': None, 'portion': None, 'piece': None, 'slice': None,
+    'handful': None, 'bowl': None,
+}
+_PER_CUP_UNITS = {'cup': 1.0, 'bowl': 1.5}
+_NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'dozen': 12, 'half': 0.5,
+    'quarter': 0.25, 'couple': 2, 'few': 3,
+}
+_FILLER_WORDS = {
+    'of', 'the', 'some', 'my', 'in', 'on', 'for', 'x', 'large', 'small', 'medium', 'big',
+    'grilled', 'baked', 'fried', 'boiled', 'roasted', 'steamed', 'scrambled', 'cooked',
+    'raw', 'fresh', 'plain', 'homemade', 'sliced', 'chopped', 'whole', 'lean',
+}
+_SEGMENT_RE = re.compile(r'[,;+&\n]|\band\b|\bwith\b|\bplus\b')
+_TOKEN_RE = re.compile(r'(\d+(?:\.\d+)?(?:/\d+)?)\s*([a-z]*)|([a-z]+)')
+_MACROS = ('calories', 'protein', 'carbs', 'fat')
+# Used when nothing in a description is recognised, as the old stub did.
+FALLBACK_ESTIMATE = {'calories': 250, 'protein': 15, 'carbs': 25, 'fat': 8}
+
+
+class NutrientTable:
+    """Nutrient-density rows (per 100 g) behind a precomputed token index.
+
+    Names and aliases are stored as token tuples in a phrase map, so a
+    description is matched with greedy longest-phrase lookups rather than a
+    scan of the table; plural forms are folded onto the indexed vocabulary.
+    Tokens that match no phrase fall back to the food sharing the most
+    tokens with them, via the token -> rows postings.
+    """
+
+    def __init__(self, rows: Iterable[tuple] = ()):
+        self.rows: List[Dict[str, Any]] = []
+        self._phrases: Dict[Tuple[str, ...], int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._max_phrase = 1
+        for row in rows:
+            self.add(*row)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._postings
+
+    def add(self, name: str, calories: float, protein: float, carbs: float, fat: float,
+            serving_g: float = 100, cup_g: Optional[float] = None, aliases: Iterable[str] = ()) -> int:
+        doc = len(self.rows)
+        self.rows.append({'name': name, 'calories': calories, 'protein': protein, 'carbs': carbs,
+                          'fat': fat, 'serving_g': serving_g, 'cup_g': cup_g})
+        for phrase in (name, *aliases):
+            key = tuple(phrase.lower().split())
+            self._phrases.setdefault(key, doc)
+            self._max_phrase = max(self._max_phrase, len(key))
+            for token in key:
+                self._postings.setdefault(token, set()).add(doc)
+        return doc
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'NutrientTable':
+        """Load rows from a CSV with name, calories, protein, carbs, fat[, serving_g, cup_g, aliases].
+
+        ``aliases`` is a ``|``-separated list; missing numbers default to 0.
+        """
+        table = cls()
+        with open(path, newline='', encoding='utf-8') as fh:
+            for rec in csv.DictReader(fh):
+                table.add(rec['name'], *(float(rec.get(k) or 0) for k in _MACROS),
+                          serving_g=float(rec.get('serving_g') or 100),
+                          cup_g=float(rec['cup_g']) if rec.get('cup_g') else None,
+                          aliases=[a for a in (rec.get('aliases') or '').split('|') if a])
+        return table
+
+    def normalize(self, token: str) -> str:
+        """Fold a plural onto the indexed vocabulary ('berries' -> 'berry')."""
+        if token in self._postings:
+            return token
+        for suffix, repl in (('ies', 'y'), ('es', ''), ('s', '')):
+            if token.endswith(suffix) and token[:-len(suffix)] + repl in self._postings:
+                return token[:-len(suffix)] + repl
+        return token
+
+    def match(self, tokens: List[str]) -> List[Tuple[int, int]]:
+        """Return ``(row, start)`` for each food phrase found, longest phrase first at each position."""
+        found = []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self._max_phrase, len(tokens) - i), 0, -1):
+                doc = self._phrases.get(tuple(tokens[i:i + n]))
+                if doc is not None:
+                    found.append((doc, i))
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    def closest(self, tokens: Iterable[str]) -> Optional[int]:
+        """Row sharing the most tokens with ``tokens`` (shorter names win ties)."""
+        scores: Dict[int, int] = {}
+        for token in tokens:
+            for doc in self._postings.get(token, ()):
+                scores[doc] = scores.get(doc, 0) + 1
+        if not scores:
+            return None
+        return min(scores, key=lambda d: (-scores[d], len(self.rows[d]['name']), d))
+
+    def grams(self, doc: int, quantity: float, unit: Optional[str]) -> float:
+        row = self.rows[doc]
+        if unit in _PER_CUP_UNITS:
+            return quantity * _PER_CUP_UNITS[unit] * (row['cup_g'] or 240)
+        per_unit = UNIT_GRAMS.get(unit) if unit else None
+        return quantity * (per_unit if per_unit is not None else row['serving_g'])
+
+    def portion(self, doc: int, grams: float) -> Dict[str, Any]:
+        row = self.rows[doc]
+        scale = grams / 100.0
+        out = {'name': row['name'], 'grams': round(grams, 1)}
+        for key in _MACROS:
+            out[key] = round(row[key] * scale, 1)
+        return out
+
+
+nutrient_table = NutrientTable(NUTRIENT_TABLE)
+
+
+def add_nutrient(name: str, calories: float, protein: float, carbs: float, fat: float, **kw) -> int:
+    """Add a row to ``nutrient_table`` and drop cached estimates that predate it."""
+    doc = nutrient_table.add(name, calories, protein, carbs, fat, **kw)
+    _estimate_segment.cache_clear()
+    return doc
+
+
+def _parse_quantity(text: str) -> float:
+    if '/' in text:
+        num, den = text.split('/')
+        return float(num) / float(den) if float(den) else 0.0
+    return float(text)
+
+
+def _unit(word: str) -> Optional[str]:
+    if word in UNIT_GRAMS:
+        return word
+    if word.endswith('es') and word[:-2] in UNIT_GRAMS:
+        return word[:-2]
+    if word.endswith('s') and word[:-1] in UNIT_GRAMS:
+        return word[:-1]
+    return None
+
+
+@functools.lru_cache(maxsize=8192)
+def _estimate_segment(segment: str) -> Tuple[Tuple[Tuple[str, Any], ...], ...]:
+    """Foods in one comma/'and'-separated segment, as hashable portion tuples.
+
+    A quantity and unit apply to the next food named after them ('1/2
+    avocado on 2 slices bread'); foods with none get one usual serving.
+    """
+    table = nutrient_table
+    words: List[str] = []
+    amounts: Dict[int, List[Any]] = {}    # word index -> [quantity, unit] starting there
+    pending: Optional[List[Any]] = None
+
+    def amount() -> List[Any]:
+        nonlocal pending
+        if pending is None:
+            pending = amounts[len(words)] = [None, None]
+        return pending
+
+    for number, suffix, word in _TOKEN_RE.findall(segment):
+        if number:
+            current = amount()
+            # '2 x 100g' multiplies; otherwise the first number wins.
+            current[0] = _parse_quantity(number) * (current[0] or 1)
+            if suffix and _unit(suffix):
+                current[1] = current[1] or _unit(suffix)
+            elif suffix and suffix != 'x':
+                words.append(table.normalize(suffix))
+                pending = None
+            continue
+        if word in _NUMBER_WORDS:
+            current = amount()
+            if current[0] is None:
+                current[0] = _NUMBER_WORDS[word]
+            elif word in ('half', 'quarter'):
+                current[0] *= _NUMBER_WORDS[word]
+            continue
+        if _unit(word) and word not in table:
+            current = amount()
+            current[1] = current[1] or _unit(word)
+            continue
+        if word not in _FILLER_WORDS:
+            words.append(table.normalize(word))
+            pending = None
+
+    found = table.match(words)
+    if not found and words:
+        doc = table.closest(words)
+        found = [(doc, 0)] if doc is not None else []
+    # A trailing amount ('yogurt x2') belongs to the last food.
+    trailing = amounts.pop(len(words), None) if words else None
+    portions = []
+    starts = sorted(amounts)
+    for k, (doc, start) in enumerate(found):
+        # The closest amount at or before this food that no earlier food used.
+        at = bisect.bisect_right(starts, start) - 1
+        quantity, unit = None, None
+        if at >= 0:
+            quantity, unit = amounts.pop(starts[at])
+            starts.pop(at)
+        elif trailing and k == len(found) - 1:
+            quantity, unit = trailing
+        grams = table.grams(doc, 1 if quantity is None else quantity, unit)
+        portions.append(tuple(table.portion(doc, grams).items()))
+    return tuple(portions)
 
 
 def estimate_from_description(description: str) -> Dict[str, Any]:
-    return {'name': description[:30], 'calories': 250, 'protein': 15}
+    """Estimate the foods and macros in a free-text meal description.
+
+    The text is split on commas, 'and', 'with' and similar; each part may
+    carry a quantity ('2', '1/2', 'half a') and a unit ('g', 'oz', 'cup',
+    'tbsp', 'slices'...) ahead of a food from ``nutrient_table``. Without a
+    unit the food's usual serving is assumed. Returns the per-food
+    breakdown under ``foods`` and the totals at the top level; if nothing is
+    recognised the totals fall back to ``FALLBACK_ESTIMATE`` and ``matched``
+    is False.
+    """
+    text = description.lower()
+    foods = [dict(p) for segment in _SEGMENT_RE.split(text) if segment.strip()
+             for p in _estimate_segment(segment.strip())]
+    result: Dict[str, Any] = {'name': description[:30], 'foods': foods, 'matched': bool(foods)}
+    if foods:
+        for key in _MACROS:
+            result[key] = round(math.fsum(f[key] for f in foods), 1)
+    else:
+        result.update(FALLBACK_ESTIMATE)
+    return result
+
+
+def estimate_many(descriptions: Iterable[str]) -> List[Dict[str, Any]]:
+    """Batch ``estimate_from_description``; repeated phrases are parsed once."""
+    return [estimate_from_description(d) for d in descriptions]
 
 
 # ----------------------------- AI Insights / Panels ----------------------
 def generate_insights_for_all(data: Dict[str, Any]) -> List[Dict[str, str]]:
-    return [
-        {'type': 'positive', 'title': 'Great consistency', 'description': 'You worked out 5 days last week.'},
-        {'type': 'suggestion', 'title': 'Hydration', 'description': 'Increase water by 1-2 glasses/day.'}
-    ]
+    """Insights for one user from ``data['meal_logs']``, ``data['daily_logs']`` and ``data['profile']``."""
+    stats = user_nutrition_stats(data.get('meal_logs'), data.get('daily_logs'), data.get('profile') or {})
+    return insights_from_stats(stats)['insights']
 
 
 # ----------------------------- Onboarding steps -------------------------
@@ -187,14 +2495,207 @@ def generate_ai_analysis_for_onboarding(form_data: Dict[str, Any]) -> Dict[str,
 
 
 # ----------------------------- Body / Charts -----------------------------
-def generate_historical_body(profile: Dict[str, Any], days: int = 7) -> List[Dict[str, Any]]:
+BODY_METRICS = ('weight', 'chest', 'waist', 'hips', 'shoulder_width', 'arms', 'legs')
+# Daily smoothing factor for trend lines; gaps of n days decay by (1 - a) ** n.
+TREND_ALPHA = 0.1
+RATE_WINDOW_DAYS = 14
+
+
+def lttb(xs: List[float], ys: List[float], threshold: int) -> List[int]:
+    """Largest-Triangle-Three-Buckets downsampling; returns the kept indices.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previous
+    pick and the next bucket's mean, which preserves peaks and dips.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+    picked = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for b in range(threshold - 2):
+        lo = int(b * every) + 1
+        hi = int((b + 1) * every) + 1
+        nxt_lo, nxt_hi = hi, min(int((b + 2) * every) + 1, n)
+        count = nxt_hi - nxt_lo
+        avg_x = math.fsum(xs[nxt_lo:nxt_hi]) / count if count else xs[-1]
+        avg_y = math.fsum(ys[nxt_lo:nxt_hi]) / count if count else ys[-1]
+        ax, ay = xs[a], ys[a]
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            area = abs((ax - avg_x) * (ys[i] - ay) - (ax - xs[i]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = i, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+class BodyTrend:
+    """Dated body-metric entries with exponentially smoothed trend lines.
+
+    Entries (``log_date`` plus any of ``BODY_METRICS``) are kept sorted by
+    day in parallel arrays; a metric missing on a day is NaN and its trend
+    carries forward. ``add`` updates the trends from the insertion point
+    on, so appending the newest entry costs O(1) per metric. Same-day
+    entries merge, later values winning. ``version`` increments on every
+    change so caches can key on it.
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = (), metrics: Iterable[str] = BODY_METRICS,
+                 alpha: float = TREND_ALPHA):
+        self.metrics = tuple(metrics)
+        self.alpha = alpha
+        self.days = array('l')
+        self.values = {m: array('d') for m in self.metrics}
+        self.trends = {m: array('d') for m in self.metrics}
+        self.version = 0
+        for entry in sorted(entries, key=lambda e: e['log_date']):
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def add(self, entry: Dict[str, Any]) -> int:
+        """Insert or merge one entry; returns its row."""
+        day = parse_log_date(entry['log_date']).toordinal()
+        pos = bisect.bisect_left(self.days, day)
+        if pos == len(self.days) or self.days[pos] != day:
+            self.days.insert(pos, day)
+            for m in self.metrics:
+                self.values[m].insert(pos, math.nan)
+                self.trends[m].insert(pos, math.nan)
+        for m in self.metrics:
+            value = entry.get(m)
+            if value is not None:
+                self.values[m][pos] = float(value)
+        self._retrend(pos)
+        self.version += 1
+        return pos
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> None:
+        for entry in entries:
+            self.add(entry)
+
+    def _retrend(self, start: int) -> None:
+        days = self.days
+        keep = 1.0 - self.alpha
+        for m in self.metrics:
+            values, trends = self.values[m], self.trends[m]
+            prev = trends[start - 1] if start else math.nan
+            for i in range(start, len(days)):
+                v = values[i]
+                if v != v:          # NaN: nothing logged for this metric
+                    t = prev
+                elif prev != prev:
+                    t = v
+                else:
+                    t = prev + (1.0 - keep ** (days[i] - days[i - 1])) * (v - prev)
+                trends[i] = t
+                prev = t
+
+    def _range(self, start: Optional[date], end: Optional[date]) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.days, start.toordinal()) if start else 0
+        hi = bisect.bisect_right(self.days, end.toordinal()) if end else len(self.days)
+        return lo, hi
+
+    def last_date(self) -> Optional[date]:
+        return date.fromordinal(self.days[-1]) if self.days else None
+
+    def latest(self, metric: str = 'weight') -> Optional[Dict[str, Any]]:
+        """Most recent logged value of ``metric`` with its trend."""
+        values = self.values[metric]
+        for i in range(len(values) - 1, -1, -1):
+            if values[i] == values[i]:
+                return {'date': date.fromordinal(self.days[i]).isoformat(), 'value': values[i],
+                        'trend': self.trends[metric][i]}
+        return None
+
+    def weekly_rate(self, metric: str = 'weight', window_days: int = RATE_WINDOW_DAYS) -> Optional[float]:
+        """Least-squares slope of the trend over the last ``window_days``, per week."""
+        if not self.days:
+            return None
+        lo = bisect.bisect_left(self.days, self.days[-1] - window_days + 1)
+        trends = self.trends[metric]
+        pts = [(self.days[i], trends[i]) for i in range(lo, len(self.days)) if trends[i] == trends[i]]
+        if len(pts) < 2:
+            return None
+        mean_x = math.fsum(x for x, _ in pts) / len(pts)
+        mean_y = math.fsum(y for _, y in pts) / len(pts)
+        sxx = math.fsum((x - mean_x) ** 2 for x, _ in pts)
+        if not sxx:
+            return None
+        sxy = math.fsum((x - mean_x) * (y - mean_y) for x, y in pts)
+        return sxy / sxx * 7
+
+    def forecast(self, metric: str = 'weight', goal: Optional[float] = None, weeks: int = 12,
+                 window_days: int = RATE_WINDOW_DAYS) -> Dict[str, Any]:
+        """Project the current trend linearly at the recent weekly rate.
+
+        Returns weekly ``points`` for up to ``weeks`` weeks (stopping at
+        ``goal`` if it is reached sooner) and, when the trend is moving
+        toward ``goal``, the ``days_to_goal`` and ``eta`` date.
+        """
+        latest = self.latest(metric)
+        rate = self.weekly_rate(metric, window_days)
+        out = {'metric': metric, 'goal': goal, 'current': None, 'weekly_rate': rate,
+               'days_to_goal': None, 'eta': None, 'points': []}
+        if latest is None:
+            return out
+        trend = self.trends[metric][-1]
+        origin = self.last_date()
+        out['current'] = round(trend, 2)
+        if goal is not None and rate and (goal - trend) * rate > 0:
+            days = math.ceil((goal - trend) / rate * 7)
+            out['days_to_goal'] = days
+            out['eta'] = (origin + timedelta(days=days)).isoformat()
+        if rate is None:
+            return out
+        for week in range(1, weeks + 1):
+            value = trend + rate * week
+            if out['days_to_goal'] is not None and week * 7 >= out['days_to_goal']:
+                out['points'].append({'date': out['eta'], 'value': goal})
+                break
+            out['points'].append({'date': (origin + timedelta(weeks=week)).isoformat(), 'value': round(value, 2)})
+        return out
+
+    def series(self, metric: str = 'weight', start: Optional[date] = None, end: Optional[date] = None,
+               points: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Logged values of ``metric`` between ``start`` and ``end`` with their trend.
+
+        With ``points``, long ranges are reduced to that many points by LTTB
+        over the logged values.
+        """
+        lo, hi = self._range(start, end)
+        values, trends = self.values[metric], self.trends[metric]
+        rows = [i for i in range(lo, hi) if values[i] == values[i]]
+        if points is not None and len(rows) > points:
+            keep = lttb([float(self.days[i]) for i in rows], [values[i] for i in rows], points)
+            rows = [rows[k] for k in keep]
+        return [{'date': date.fromordinal(self.days[i]).isoformat(), 'value': values[i],
+                 'trend': round(trends[i], 2)} for i in rows]
+
+
+def generate_historical_body(profile: Dict[str, Any], days: int = 7, history: Optional[BodyTrend] = None,
+                             points: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Weight chart data for the ``days`` ending at the latest body entry.
+
+    Each point is ``{'date', 'weight', 'trend'}``, downsampled to
+    ``points`` when given. Without logged history the profile's current
+    weight is the only point.
+    """
     if not profile:
         return []
-    base_weight = profile.get('weight', 70)
-    data = []
-    for i in range(days):
-        data.append({'date': f'Day {i+1}', 'weight': round(base_weight - i * 0.1, 1)})
-    return data
+    if history is None or history.latest('weight') is None:
+        weight = profile.get('weight')
+        return [] if weight is None else [{'date': date.today().isoformat(), 'weight': weight, 'trend': weight}]
+    end = history.last_date()
+    rows = history.series('weight', end - timedelta(days=days - 1), end, points)
+    return [{'date': r['date'], 'weight': r['value'], 'trend': r['trend']} for r in rows]
 
 
 def macro_breakdown(totals: Dict[str, float]) -> Dict[str, float]:
@@ -225,6 +2726,98 @@ def compute_targets(profile: Dict[str, Any]) -> Dict[str, int]:
     return {'calories': round(calorieTarget), 'protein': round(proteinTarget)}
 
 
+# Profile fields each derived result reads; a change to any other field
+# leaves the cached result valid.
+PROFILE_DEPENDENCIES = {
+    'targets': ('weight', 'fitness_goal'),
+    'historical_body': ('weight',),
+    'ai_analysis': ('age', 'height', 'weight', 'body_type', 'fitness_goal', 'chest', 'waist', 'hips',
+                    'shoulder_width', 'arms', 'legs', 'posture_notes'),
+}
+
+
+def _entry_valid(entry: Optional[tuple], fingerprint: tuple, sources: tuple) -> bool:
+    """Whether a cached ``(fingerprint, sources, value)`` entry still holds for these inputs.
+
+    The entry keeps its source objects alive and compares them by identity,
+    so a new object can't pass for a freed one that had the same ``id()``.
+    """
+    return (entry is not None and entry[0] == fingerprint and len(entry[1]) == len(sources)
+            and all(a is b for a, b in zip(entry[1], sources)))
+
+
+class ProfileCache:
+    """Memoizes results derived from the user profile.
+
+    Each entry is stored with a fingerprint of the profile fields it depends
+    on (``PROFILE_DEPENDENCIES``) plus its call arguments, so a lookup is a
+    tuple comparison. ``update_profile`` (called by ``save_profile``) drops
+    only the entries whose fields changed. Entries also hold any source
+    objects they were computed from and only match the same objects by
+    identity. Cached values are shared; treat them as read-only.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, tuple], Tuple[tuple, tuple, Any]] = {}
+        self._profile: Dict[str, Any] = {}
+        self.hits: Dict[str, int] = {name: 0 for name in PROFILE_DEPENDENCIES}
+        self.misses: Dict[str, int] = {name: 0 for name in PROFILE_DEPENDENCIES}
+
+    def _get(self, name: str, profile: Dict[str, Any], compute: Callable[[], Any], args: tuple = (),
+             version: Any = None, sources: tuple = ()) -> Any:
+        fingerprint = tuple(profile.get(f) for f in PROFILE_DEPENDENCIES[name]) + (version,)
+        entry = self._entries.get((name, args))
+        if _entry_valid(entry, fingerprint, sources):
+            self.hits[name] += 1
+            return entry[2]
+        self.misses[name] += 1
+        value = compute()
+        self._entries[(name, args)] = (fingerprint, sources, value)
+        return value
+
+    def targets(self, profile: Dict[str, Any]) -> Dict[str, int]:
+        return self._get('targets', profile, lambda: compute_targets(profile))
+
+    def historical_body(self, profile: Dict[str, Any], days: int = 7, history: Optional[BodyTrend] = None,
+                        points: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cached ``generate_historical_body``; also recomputed whenever ``history`` changes."""
+        return self._get('historical_body', profile, lambda: generate_historical_body(profile, days, history, points),
+                         (days, points), history.version if history is not None else None, (history,))
+
+    def ai_analysis(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        return self._get('ai_analysis', profile, lambda: generate_ai_analysis_for_onboarding(profile))
+
+    def invalidate(self, fields: Optional[Iterable[str]] = None) -> int:
+        """Drop entries that depend on any of ``fields`` (all entries if None); returns the count."""
+        if fields is None:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        fields = set(fields)
+        stale = [key for key in self._entries if fields.intersection(PROFILE_DEPENDENCIES[key[0]])]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def update_profile(self, profile: Dict[str, Any]) -> List[str]:
+        """Record a saved profile and invalidate results depending on the fields that changed."""
+        changed = [k for k in set(self._profile) | set(profile) if self._profile.get(k) != profile.get(k)]
+        self._profile = dict(profile)
+        self.invalidate(changed)
+        return changed
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name in PROFILE_DEPENDENCIES:
+            lookups = self.hits[name] + self.misses[name]
+            out[name] = {'hits': self.hits[name], 'misses': self.misses[name],
+                         'hit_rate': self.hits[name] / lookups if lookups else 0.0}
+        return out
+
+
+profile_cache = ProfileCache()
+
+
 # ----------------------------- Meals / Cards ----------------------------
 def meal_summary(meal: Dict[str, Any]) -> Dict[str, Any]:
     return {
@@ -233,10 +2826,18 @@ def meal_summary(meal: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def render_meal(meal: Dict[str, Any]) -> str:
+    foods = ', '.join(f.get('name', '') for f in meal.get('foods', [])) or 'Meal'
+    return f"{meal.get('meal_type', 'meal').title()}: {foods} - {meal.get('total_calories', 0):g} cal"
+
+
 # ----------------------------- Metrics & Quick Tracker ------------------
-def summarize_metrics(logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+def summarize_metrics(logs: Union[List[Dict[str, Any]], LogColumns]) -> Dict[str, Any]:
     if not logs:
         return {}
+    if isinstance(logs, LogColumns):
+        means = logs.means(['water_glasses', 'sleep_hours', 'steps'])
+        return {'avg_water': means['water_glasses'], 'avg_sleep': means['sleep_hours'], 'avg_steps': means['steps']}
     avg_water = sum(l.get('water_glasses', 0) for l in logs) / len(logs)
     avg_sleep = sum(l.get('sleep_hours', 0) for l in logs) / len(logs)
     avg_steps = sum(l.get('steps', 0) for l in logs) / len(logs)
@@ -244,40 +2845,536 @@ def summarize_metrics(logs: List[Dict[str, Any]]) -> Dict[str, Any]:
 
 
 # ----------------------------- Nutrition Insights -----------------------
-def generate_nutrition_insights(weekly_logs: List[Dict[str, Any]], profile: Dict[str, Any], daily_totals: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    if not weekly_logs or len(weekly_logs) < 2:
-        return None
-    avg_cal = sum(m.get('total_calories', 0) for m in weekly_logs) / len(weekly_logs)
+RECOMMENDED_WATER_GLASSES = 8
+RECOMMENDED_SLEEP_HOURS = 7
+
+
+def user_nutrition_stats(meal_logs: Union[List[Dict[str, Any]], LogColumns],
+                         daily_logs: Union[List[Dict[str, Any]], LogColumns, None],
+                         profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-day nutrition and wellness averages for one user, from column sums.
+
+    Calories and protein are averaged over the distinct days with meals;
+    water and sleep over the daily logs (None when there are none).
+    """
+    meals = meal_logs if isinstance(meal_logs, LogColumns) else meal_log_columns(meal_logs or [])
+    days = len(meals.by_date) or 1
+    sums = meals.sums(['total_calories', 'total_protein'])
+    weight = profile.get('weight') or 70
+    targets = compute_targets({**profile, 'weight': weight})
+    avg_cal = sums['total_calories'] / days
+    avg_protein = sums['total_protein'] / days
+    daily = daily_logs if isinstance(daily_logs, LogColumns) else daily_log_columns(daily_logs or [])
+    wellness = summarize_metrics(daily)
     return {
-        'goalAlignment': 70,
-        'topRecommendation': 'Slightly increase protein to reach 1.6–2g/kg',
-        'insights': [
-            {'title': 'Protein Intake', 'description': 'Protein is slightly below target.', 'type': 'suggestion'},
-            {'title': 'Calories', 'description': 'Average calories align moderately with goal.', 'type': 'positive'}
-        ]
+        'meal_days': len(meals.by_date),
+        'meals': len(meals),
+        'avg_calories': avg_cal,
+        'calorie_target': targets['calories'],
+        'calorie_ratio': avg_cal / targets['calories'] if targets['calories'] else None,
+        'avg_protein': avg_protein,
+        'protein_per_kg': avg_protein / weight,
+        'protein_target_per_kg': targets['protein'] / weight,
+        'avg_water': wellness.get('avg_water'),
+        'avg_sleep': wellness.get('avg_sleep'),
     }
 
 
+def insights_from_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn ``user_nutrition_stats`` output into the goalAlignment/insights shape the UI shows."""
+    insights = []
+    ratio = stats['calorie_ratio'] or 0
+    calorie_score = max(0.0, 100 - abs(ratio - 1) * 200)
+    protein_target = stats['protein_target_per_kg']
+    # Without a protein target the alignment score rests on calories alone
+    if protein_target:
+        alignment = 0.6 * calorie_score + 0.4 * min(100.0, 100 * stats['protein_per_kg'] / protein_target)
+    else:
+        alignment = calorie_score
+
+    if protein_target and stats['protein_per_kg'] < 0.9 * protein_target:
+        insights.append({'title': 'Protein Intake', 'type': 'suggestion',
+                         'description': f"Protein averages {stats['protein_per_kg']:.1f} g/kg; "
+                                        f"aim for {protein_target:.1f} g/kg."})
+    elif protein_target:
+        insights.append({'title': 'Protein Intake', 'type': 'positive',
+                         'description': f"Protein is on target at {stats['protein_per_kg']:.1f} g/kg."})
+    if ratio < 0.9:
+        insights.append({'title': 'Calories', 'type': 'suggestion',
+                         'description': f"Average {stats['avg_calories']:.0f} kcal/day is below your "
+                                        f"{stats['calorie_target']} kcal target."})
+    elif ratio > 1.1:
+        insights.append({'title': 'Calories', 'type': 'warning',
+                         'description': f"Average {stats['avg_calories']:.0f} kcal/day is above your "
+                                        f"{stats['calorie_target']} kcal target."})
+    else:
+        insights.append({'title': 'Calories', 'type': 'positive',
+                         'description': f"Average {stats['avg_calories']:.0f} kcal/day aligns with your goal."})
+    if stats['avg_water'] is not None and stats['avg_water'] < RECOMMENDED_WATER_GLASSES:
+        insights.append({'title': 'Hydration', 'type': 'suggestion',
+                         'description': f"Water averages {stats['avg_water']:.1f} glasses/day; "
+                                        f"aim for {RECOMMENDED_WATER_GLASSES}."})
+    if stats['avg_sleep'] is not None and stats['avg_sleep'] < RECOMMENDED_SLEEP_HOURS:
+        insights.append({'title': 'Sleep', 'type': 'suggestion',
+                         'description': f"Sleep averages {stats['avg_sleep']:.1f} h/night; "
+                                        f"aim for {RECOMMENDED_SLEEP_HOURS}-8 hours."})
+
+    actions = [i for i in insights if i['type'] != 'positive']
+    return {
+        'goalAlignment': round(alignment),
+        'topRecommendation': actions[0]['description'] if actions else 'You are on track - keep it up!',
+        'insights': insights,
+    }
+
+
+def generate_nutrition_insights(weekly_logs: Union[List[Dict[str, Any]], LogColumns], profile: Dict[str, Any],
+                                daily_totals: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Insights over ``weekly_logs``, or None with fewer than two meals; ``daily_totals`` is unused."""
+    if not weekly_logs or len(weekly_logs) < 2:
+        return None
+    return insights_from_stats(user_nutrition_stats(weekly_logs, None, profile))
+
+
+def _insight_chunk(users: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for user in users:
+        stats = user_nutrition_stats(user.get('meal_logs'), user.get('daily_logs'), user.get('profile') or {})
+        out.append({'user_id': user.get('user_id'), 'stats': stats, **insights_from_stats(stats)})
+    return out
+
+
+def batch_nutrition_insights(users: Iterable[Dict[str, Any]], workers: Optional[int] = None,
+                             chunk_size: int = 256) -> Dict[str, Any]:
+    """Compute insights for many users, fanned out over a process pool.
+
+    Each user is a dict with ``user_id``, ``meal_logs``, ``daily_logs`` and
+    ``profile``. Users are sent to workers in chunks of ``chunk_size``;
+    ``workers=0`` runs inline. Results keep input order.
+    """
+    started = time.perf_counter()
+    users = list(users)
+    chunks = [users[i:i + chunk_size] for i in range(0, len(users), chunk_size)]
+    results: List[Dict[str, Any]] = []
+    if workers == 0 or len(chunks) <= 1:
+        for chunk in chunks:
+            results.extend(_insight_chunk(chunk))
+    else:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_results in pool.map(_insight_chunk, chunks):
+                results.extend(chunk_results)
+    elapsed = time.perf_counter() - started
+    return {'results': results, 'users': len(users), 'seconds': elapsed,
+            'users_per_sec': len(users) / elapsed if elapsed else 0.0}
+
+
 # ----------------------------- Wellness & Consistency ------------------
+WELLNESS_METRICS = ('sleep_hours', 'water_glasses', 'steps')
+ROLLING_WINDOWS = (7, 30, 90, 365)
+
+
+def parse_log_date(value: str) -> date:
+    return date.fromisoformat(value[:10])
+
+
+def logs_between(logs: Iterable[Dict[str, Any]], start: Optional[str] = None,
+                 end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Logs whose ``log_date`` falls in ``start``..``end`` (inclusive ISO dates; None leaves that side open).
+
+    ISO dates sort the same as strings, so the window is picked by comparing
+    each log's date part as text, without parsing any of them. Undated logs
+    are dropped.
+    """
+    lo = start or ''
+    hi = end or '\uffff'
+    return [l for l in logs if l.get('log_date') and lo <= l['log_date'][:10] <= hi]
+
+
+class WellnessSeries:
+    """Date-indexed daily metrics with O(1) rolling window sums and means.
+
+    Logs are laid out on a dense calendar from the first to the last logged
+    date (widened to ``start``/``end`` when given). Prefix sums over each
+    metric and over the "day was logged" flag make any trailing window a
+    constant-time lookup; means are taken over logged days only, so gaps
+    don't drag averages toward zero.
+    """
+
+    def __init__(self, logs: Iterable[Dict[str, Any]], metrics: Iterable[str] = WELLNESS_METRICS,
+                 start: Optional[date] = None, end: Optional[date] = None):
+        self.metrics = tuple(metrics)
+        dated = [(parse_log_date(l['log_date']), l) for l in logs if l.get('log_date')]
+        if not dated:
+            self.start = self.end = None
+            self.size = 0
+        else:
+            self.start = min([d for d, _ in dated] + ([start] if start else []))
+            self.end = max([d for d, _ in dated] + ([end] if end else []))
+            self.size = (self.end - self.start).days + 1
+        self.values = {m: array('d', bytes(8 * self.size)) for m in self.metrics}
+        self.present = bytearray(self.size)
+        for d, log in dated:
+            i = (d - self.start).days
+            self.present[i] = 1
+            for m in self.metrics:
+                self.values[m][i] = log.get(m) or 0
+        self._prefix = {m: self._cumulative(self.values[m]) for m in self.metrics}
+        self._logged = self._cumulative(self.present)
+
+    @staticmethod
+    def _cumulative(values) -> array:
+        out = array('d', [0.0])
+        total = 0.0
+        for v in values:
+            total += v
+            out.append(total)
+        return out
+
+    def date_at(self, i: int) -> date:
+        return self.start + timedelta(days=i)
+
+    def index_of(self, d: date) -> int:
+        return (d - self.start).days
+
+    def window(self, metric: str, i: int, window: int) -> Dict[str, Any]:
+        """Sum, logged-day count and mean of ``metric`` over the ``window`` days ending at index ``i``."""
+        lo = max(0, i + 1 - window)
+        prefix = self._prefix[metric]
+        total = prefix[i + 1] - prefix[lo]
+        count = int(self._logged[i + 1] - self._logged[lo])
+        return {'sum': total, 'count': count, 'mean': total / count if count else None}
+
+    def value(self, metric: str, i: int, fill: Optional[str] = 'zero', last: Any = None) -> Any:
+        if self.present[i]:
+            return self.values[metric][i]
+        if fill == 'zero':
+            return 0
+        if fill == 'ffill':
+            return last
+        return None
+
+    def series(self, metric: str, days: Optional[int] = None, fill: Optional[str] = 'zero') -> List[Dict[str, Any]]:
+        """Dense per-day values for the trailing ``days`` (all days if None).
+
+        ``fill`` controls missing dates: 'zero', 'ffill' (carry the last
+        logged value) or None.
+        """
+        if not self.size:
+            return []
+        first = 0 if days is None else max(0, self.size - days)
+        out = []
+        last = None
+        if fill == 'ffill':
+            for i in range(first - 1, -1, -1):
+                if self.present[i]:
+                    last = self.values[metric][i]
+                    break
+        for i in range(first, self.size):
+            v = self.value(metric, i, fill, last)
+            if self.present[i]:
+                last = v
+            out.append({'date': self.date_at(i).isoformat(), 'value': v})
+        return out
+
+    def rolling(self, metric: str, window: int, days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rolling sum and mean of ``metric`` for each of the trailing ``days``."""
+        if not self.size:
+            return []
+        first = 0 if days is None else max(0, self.size - days)
+        out = []
+        for i in range(first, self.size):
+            stats = self.window(metric, i, window)
+            out.append({'date': self.date_at(i).isoformat(), 'sum': stats['sum'], 'mean': stats['mean']})
+        return out
+
+    def summary(self, windows: Iterable[int] = ROLLING_WINDOWS) -> Dict[int, Dict[str, Any]]:
+        """Trailing-window sums and means for every metric, keyed by window length."""
+        out = {}
+        for w in windows:
+            out[w] = {m: self.window(m, self.size - 1, w) for m in self.metrics} if self.size else {}
+        return out
+
+
 def time_series_from_logs(logs: List[Dict[str, Any]], key: str = 'sleep_hours', days: int = 7) -> List[Dict[str, Any]]:
+    dates = [l.get('log_date') for l in logs]
+    if dates and all(dates):
+        # Only the last ``days`` days reach WellnessSeries
+        last = parse_log_date(max(dates))
+        first = (last - timedelta(days=days - 1)).isoformat()
+        return WellnessSeries(logs_between(logs, first), [key], start=parse_log_date(first)).series(key, days)
     series = []
     for i in range(days):
         series.append({'date': f'Day {i+1}', 'value': logs[i].get(key, 0) if i < len(logs) else 0})
     return series
 
 
-def compute_completion(logs: List[Dict[str, Any]], workout_plan: Dict[str, Any]) -> List[Dict[str, Any]]:
-    return [{'date': f'Day {i+1}', 'percentage': (i * 10) % 100} for i in range(7)]
+def _exercise_key(exercise: Dict[str, Any]) -> str:
+    return (exercise.get('exercise_name') or exercise.get('name') or '').lower()
+
+
+def completion_report(logs: List[Dict[str, Any]], workout_plan: Union[Dict[str, Any], 'CompiledWorkoutPlan'],
+                      start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Any]:
+    """Join completed exercises against the plan's schedule, day by day.
+
+    Logs outside ``start``..``end`` are dropped before the rest are sorted
+    and merged with the calendar (default: the logged range). A day's
+    percentage is the share of its scheduled exercise names found in
+    ``exercises_completed``; days with nothing scheduled get ``None`` and
+    neither extend nor break a streak. Weeks start on Monday. Streaks count
+    consecutive fully completed days.
+    """
+    plan = workout_plan if isinstance(workout_plan, CompiledWorkoutPlan) else CompiledWorkoutPlan(dict(workout_plan))
+    schedule = {day: {_exercise_key(ex) for ex in exs} for day, exs in plan.by_day.items()}
+    window = logs_between(logs, start and start.isoformat(), end and end.isoformat())
+    dated = sorted(((parse_log_date(l['log_date']), l) for l in window), key=lambda pair: pair[0])
+    if start is None:
+        start = dated[0][0] if dated else (end or date.today())
+    if end is None:
+        end = dated[-1][0] if dated else start
+
+    daily, weekly = [], []
+    week = None
+    streak = longest = 0
+    pos = 0
+    d = start
+    while d <= end:
+        done = set()
+        while pos < len(dated) and dated[pos][0] <= d:
+            if dated[pos][0] == d:
+                done.update(_exercise_key(ex) for ex in dated[pos][1].get('exercises_completed') or [])
+            pos += 1
+        scheduled = schedule.get(WEEKDAYS[d.weekday()], set())
+        completed = len(scheduled & done)
+        percentage = round(100 * completed / len(scheduled)) if scheduled else None
+        daily.append({'date': d.isoformat(), 'scheduled': len(scheduled), 'completed': completed,
+                      'percentage': percentage})
+        if scheduled:
+            streak = streak + 1 if completed == len(scheduled) else 0
+            longest = max(longest, streak)
+
+        week_start = d - timedelta(days=d.weekday())
+        if week is None or week['week_start'] != week_start.isoformat():
+            week = {'week_start': week_start.isoformat(), 'scheduled': 0, 'completed': 0}
+            weekly.append(week)
+        week['scheduled'] += len(scheduled)
+        week['completed'] += completed
+        d += timedelta(days=1)
+
+    for week in weekly:
+        week['percentage'] = round(100 * week['completed'] / week['scheduled']) if week['scheduled'] else None
+    return {'daily': daily, 'weekly': weekly, 'current_streak': streak, 'longest_streak': longest}
+
+
+def compute_completion(logs: List[Dict[str, Any]], workout_plan: Union[Dict[str, Any], 'CompiledWorkoutPlan'],
+                       days: int = 7) -> List[Dict[str, Any]]:
+    """Completion percentage for each of the last ``days`` days (rest days read 0)."""
+    ends = [l['log_date'][:10] for l in logs if l.get('log_date')]
+    end = parse_log_date(max(ends)) if ends else date.today()
+    report = completion_report(logs, workout_plan, start=end - timedelta(days=days - 1), end=end)
+    return [{'date': d['date'], 'percentage': d['percentage'] or 0} for d in report['daily']]
 
 
 # ----------------------------- Workout Plan -----------------------------
-def get_today_exercises(plan: Dict[str, Any], day_name: str) -> List[Dict[str, Any]]:
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def sample_workout_plan() -> Dict[str, Any]:
+    return {
+        'plan_name': 'Starter Strength',
+        'goal': 'muscle_gain',
+        'intensity': 'intermediate',
+        'duration_weeks': 8,
+        'exercises': [
+            {'day': 'Monday', 'exercise_name': 'Bench Press', 'sets': 4, 'reps': 8},
+            {'day': 'Monday', 'exercise_name': 'Incline Dumbbell', 'sets': 3, 'reps': 10},
+            {'day': 'Tuesday', 'exercise_name': 'Squat', 'sets': 4, 'reps': 6},
+            {'day': 'Wednesday', 'exercise_name': 'Deadlift', 'sets': 3, 'reps': 5},
+        ]
+    }
+
+
+def exercise_volume(exercise: Dict[str, Any]) -> float:
+    return (exercise.get('sets') or 0) * (exercise.get('reps') or 0)
+
+
+class CompiledWorkoutPlan:
+    """Workout plan with a precomputed weekday -> exercises index.
+
+    Built once from a ``workout_plan_schema`` dict; per-day and weekly volume
+    (sets x reps) are kept alongside. Edits made through ``add_exercise``,
+    ``update_exercise`` and ``remove_exercise`` update the plan dict and only
+    the affected day buckets.
+    """
+
+    def __init__(self, plan: Dict[str, Any]):
+        self.plan = plan
+        plan.setdefault('exercises', [])
+        self.by_day: Dict[str, List[Dict[str, Any]]] = {}
+        self.day_volume: Dict[str, float] = {}
+        self.week_volume = 0.0
+        for exercise in plan['exercises']:
+            self._index(exercise, 1)
+
+    def _index(self, exercise: Dict[str, Any], sign: int) -> None:
+        day = exercise.get('day')
+        volume = exercise_volume(exercise)
+        if sign > 0:
+            self.by_day.setdefault(day, []).append(exercise)
+        else:
+            bucket = self.by_day[day]
+            del bucket[next(i for i, ex in enumerate(bucket) if ex is exercise)]
+            if not bucket:
+                del self.by_day[day]
+        self.day_volume[day] = self.day_volume.get(day, 0) + sign * volume
+        if day not in self.by_day:
+            self.day_volume.pop(day, None)
+        self.week_volume += sign * volume
+
+    def exercises_for(self, day_name: str) -> List[Dict[str, Any]]:
+        return self.by_day.get(day_name, [])
+
+    def add_exercise(self, exercise: Dict[str, Any]) -> None:
+        self.plan['exercises'].append(exercise)
+        self._index(exercise, 1)
+
+    def update_exercise(self, position: int, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply ``changes`` to the exercise at ``position`` in the plan's list."""
+        exercise = self.plan['exercises'][position]
+        self._index(exercise, -1)
+        exercise.update(changes)
+        self._index(exercise, 1)
+        return exercise
+
+    def remove_exercise(self, position: int) -> Dict[str, Any]:
+        exercise = self.plan['exercises'].pop(position)
+        self._index(exercise, -1)
+        return exercise
+
+
+def compile_workout_plan(plan: Dict[str, Any]) -> CompiledWorkoutPlan:
+    return CompiledWorkoutPlan(plan)
+
+
+def get_today_exercises(plan: Union[Dict[str, Any], CompiledWorkoutPlan], day_name: str) -> List[Dict[str, Any]]:
+    if isinstance(plan, CompiledWorkoutPlan):
+        return plan.exercises_for(day_name)
     return [ex for ex in plan.get('exercises', []) if ex.get('day') == day_name]
 
 
+# ----------------------------- Chart Data -------------------------------
+# Log kinds each chart metric is computed from.
+CHART_SOURCES = {
+    'water_glasses': ('daily',),
+    'sleep_hours': ('daily',),
+    'steps': ('daily',),
+    'completion': ('daily', 'plan'),
+    'weight': ('body',),
+    'macros': ('meal',),
+}
+LOCAL_USER = 'local'
+
+
+def downsample(series: List[Dict[str, Any]], width: Optional[float], value_key: str) -> List[Dict[str, Any]]:
+    """Reduce ``series`` to at most one point per pixel of ``width`` with LTTB."""
+    if not width or len(series) <= int(width):
+        return series
+    keep = lttb([float(i) for i in range(len(series))], [float(p.get(value_key) or 0) for p in series], int(width))
+    return [series[i] for i in keep]
+
+
+class ChartPipeline:
+    """Shared cache of chart series keyed by (user, metric, range).
+
+    Each series is computed once and stored with the versions of the log
+    kinds it reads (``CHART_SOURCES``) and the source objects it was
+    computed from, compared by identity. ``invalidate`` bumps the versions
+    when logs change, so only dependent charts recompute. The source's
+    length is part of the fingerprint too, so plain appends are noticed
+    even without an ``invalidate``, but in-place edits are not. Copies
+    downsampled to a widget's pixel width are cached next to the full
+    series, which makes a 365-day chart cost the same as a 7-day one once
+    warm. Cached series are shared; treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[tuple, Tuple[tuple, tuple, Any]]' = OrderedDict()
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self.hits = self.misses = 0
+
+    def invalidate(self, user: Optional[str] = None, source: Optional[str] = None) -> None:
+        """Mark ``source`` logs ('daily', 'meal', 'body', 'plan'; all if None) of ``user`` (all if None) changed."""
+        if user is None:
+            stale = [k for k in self._entries if source is None or source in CHART_SOURCES[k[1]]]
+            for key in stale:
+                del self._entries[key]
+            return
+        for s in ([source] if source else {s for deps in CHART_SOURCES.values() for s in deps}):
+            self._versions[(user, s)] = self._versions.get((user, s), 0) + 1
+
+    def _get(self, user: str, metric: str, args: tuple, width: Optional[float], value_key: Optional[str],
+             sources: tuple, extra: tuple, compute: Callable[[], Any]) -> Any:
+        fingerprint = tuple(self._versions.get((user, s), 0) for s in CHART_SOURCES[metric]) + extra
+        full = self._lookup((user, metric, args, None), fingerprint, sources, compute)
+        if value_key is None or not width:
+            return full
+        return self._lookup((user, metric, args, int(width)), fingerprint, sources,
+                            lambda: downsample(full, width, value_key))
+
+    def _lookup(self, key: tuple, fingerprint: tuple, sources: tuple, compute: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        if _entry_valid(entry, fingerprint, sources):
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[2]
+        self.misses += 1
+        value = compute()
+        self._entries[key] = (fingerprint, sources, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def time_series(self, logs: List[Dict[str, Any]], key: str = 'sleep_hours', days: int = 7,
+                    width: Optional[float] = None, user: str = LOCAL_USER) -> List[Dict[str, Any]]:
+        return self._get(user, key, (days,), width, 'value', (logs,), (len(logs),),
+                         lambda: time_series_from_logs(logs, key, days))
+
+    def completion(self, logs: List[Dict[str, Any]], workout_plan: Union[Dict[str, Any], 'CompiledWorkoutPlan'],
+                   days: int = 7, width: Optional[float] = None, user: str = LOCAL_USER) -> List[Dict[str, Any]]:
+        return self._get(user, 'completion', (days,), width, 'percentage', (logs, workout_plan), (len(logs),),
+                         lambda: compute_completion(logs, workout_plan, days))
+
+    def body(self, profile: Dict[str, Any], days: int = 7, history: Optional[BodyTrend] = None,
+             width: Optional[float] = None, user: str = LOCAL_USER) -> List[Dict[str, Any]]:
+        extra = (profile.get('weight'), history.version if history is not None else None)
+        return self._get(user, 'weight', (days,), width, 'weight', (history,), extra,
+                         lambda: generate_historical_body(profile, days, history))
+
+    def macros(self, totals: Dict[str, float], day: Optional[str] = None,
+               user: str = LOCAL_USER) -> Dict[str, float]:
+        extra = tuple(totals.get(k, 0) for k in ('protein', 'carbs', 'fat'))
+        return self._get(user, 'macros', (day,), None, None, (), extra, lambda: macro_breakdown(totals))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+chart_data = ChartPipeline()
+
+
 # ----------------------------- Daily Tracker ---------------------------
-def make_log(date_str: str, water: int = 0, sleep: float = 0.0, steps: int = 0) -> Dict[str, Any]:
-    return {'log_date': date_str, 'water_glasses': water, 'sleep_hours': sleep, 'steps': steps}
+def make_log(date_str: str, water: int = 0, sleep: float = 0.0, steps: int = 0,
+             oplog: Optional[OpLog] = None) -> Dict[str, Any]:
+    log = {'log_date': date_str, 'water_glasses': water, 'sleep_hours': sleep, 'steps': steps}
+    if oplog is not None:
+        oplog.record_put('daily', log)
+    return log
 
 
 # ----------------------------- Goals -----------------------------------
@@ -308,8 +3405,78 @@ def render_post(post: Dict[str, Any]) -> str:
     return f"{author}: {post.get('content', '')} ({post.get('likes', 0)} likes)"
 
 
+class PostRenderCache:
+    """Bounded LRU of rendered post text keyed by post id and version.
+
+    A post's version is whatever changes when its text would (by default
+    the fields ``render_post`` reads). Only the latest version of each
+    post is kept, so edits replace rather than accumulate entries.
+    """
+
+    def __init__(self, maxsize: int = 2048):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[Any, Tuple[Any, str]]' = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def fingerprint(post: Dict[str, Any]) -> tuple:
+        return (post.get('content'), post.get('likes', 0), post.get('is_anonymous'), post.get('created_by'))
+
+    def render(self, post: Dict[str, Any], version: Any = None) -> str:
+        post_id = post.get('id')
+        if post_id is None:
+            self.misses += 1
+            return render_post(post)
+        if version is None:
+            version = self.fingerprint(post)
+        entry = self._entries.get(post_id)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            self._entries.move_to_end(post_id)
+            return entry[1]
+        self.misses += 1
+        text = render_post(post)
+        self._entries[post_id] = (version, text)
+        self._entries.move_to_end(post_id)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return text
+
+    def render_many(self, posts: Iterable[Dict[str, Any]], versions: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Render a whole page; ``versions`` maps post id to version, defaulting to ``fingerprint``."""
+        if versions is None:
+            return [self.render(p) for p in posts]
+        return [self.render(p, versions.get(p.get('id'))) for p in posts]
+
+    def resize(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        while len(self._entries) > maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+post_render_cache = PostRenderCache()
+
+
+def render_posts(posts: Iterable[Dict[str, Any]], versions: Optional[Dict[str, Any]] = None) -> List[str]:
+    return post_render_cache.render_many(posts, versions)
+
+
 # ----------------------------- Quick helpers ---------------------------
-def update_field(log: Dict[str, Any], field: str, value: Any) -> Dict[str, Any]:
+def update_field(log: Dict[str, Any], field: str, value: Any,
+                 oplog: Optional[OpLog] = None, kind: str = 'daily') -> Dict[str, Any]:
+    if oplog is not None and log.get(field) != value:
+        oplog.record_set(kind, log, field, value)
     log[field] = value
     return log
 
@@ -323,6 +3490,164 @@ def top_exercises(exercises: List[Dict[str, Any]], n: int = 3) -> List[Dict[str,
     return exercises[:n]
 
 
+# ----------------------------- Instrumentation --------------------------
+# Module-level functions that are never wrapped: the CLI and the
+# instrumentation entry points themselves.
+_UNINSTRUMENTED = {'list_sections', 'demo', 'public_functions'}
+
+
+def public_functions() -> List[str]:
+    """Names of the public module-level functions (everything in MODULES and the rest)."""
+    import inspect
+    module = globals()
+    return sorted(name for name, value in module.items()
+                  if inspect.isfunction(value) and value.__module__ == __name__
+                  and not name.startswith('_') and name not in _UNINSTRUMENTED)
+
+
+class Instrumentation:
+    """Opt-in call counters and timers for the public functions.
+
+    ``enable`` swaps each function in this module's namespace for a thin
+    timing wrapper and ``disable`` puts the originals back, so nothing is
+    paid while it is off. Callers that go through the module (``ff.name``
+    or plain global calls in here) see the wrappers. ``record`` and
+    ``timer`` add named timings from elsewhere (the app's tab builds).
+    ``start_capture`` runs every Nth instrumented call under cProfile.
+    Counters and the sampling state are guarded by a lock, since worker
+    threads call the wrapped functions too. Only one sampled call is
+    profiled at a time, on whichever thread made it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats: Dict[str, List[float]] = {}
+        self._originals: Dict[str, Callable[..., Any]] = {}
+        self._profiler: Optional['cProfile.Profile'] = None
+        self._sample_every = 0
+        self._calls = 0
+        self._profiling = False
+        self._lock = threading.Lock()
+
+    def _wrap(self, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        self.stats.setdefault(name, [0, 0.0, 0.0])
+        perf = time.perf_counter
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if self._profiler is not None:
+                profiler = self._claim_profiler()
+                if profiler is not None:
+                    return self._profiled(profiler, name, fn, args, kwargs)
+            start = perf()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, perf() - start)
+
+        return wrapper
+
+    def _claim_profiler(self) -> Optional['cProfile.Profile']:
+        """Count a call and return the profiler if this call is sampled and no other is running."""
+        with self._lock:
+            if self._profiler is None or self._profiling:
+                return None
+            self._calls += 1
+            if self._calls % self._sample_every:
+                return None
+            self._profiling = True
+            return self._profiler
+
+    def _profiled(self, profiler: 'cProfile.Profile', name: str, fn: Callable[..., Any], args: tuple,
+                  kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._profiling = False
+            self.record(name, elapsed)
+
+    def enable(self, names: Optional[Iterable[str]] = None) -> None:
+        module = globals()
+        for name in names or public_functions():
+            if name not in self._originals:
+                self._originals[name] = module[name]
+                module[name] = self._wrap(name, module[name])
+        self.enabled = True
+
+    def disable(self) -> None:
+        module = globals()
+        module.update(self._originals)
+        self._originals.clear()
+        self.enabled = False
+
+    def record(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def start_capture(self, sample_every: int = 1) -> None:
+        """Profile every ``sample_every``-th instrumented call with cProfile until ``stop_capture``."""
+        import cProfile
+        with self._lock:
+            self._profiler = cProfile.Profile()
+            self._sample_every = max(1, sample_every)
+            self._calls = 0
+
+    def stop_capture(self, limit: int = 20, sort: str = 'cumulative') -> str:
+        import pstats
+        with self._lock:
+            profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return ''
+        out = io.StringIO()
+        try:
+            pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+        except TypeError:
+            return 'No sampled calls were profiled.\n'
+        return out.getvalue()
+
+    def reset(self) -> None:
+        with self._lock:
+            for stats in self.stats.values():
+                stats[:] = [0, 0.0, 0.0]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-name calls, total/mean/max seconds, busiest first."""
+        with self._lock:
+            snapshot = [(name, *stats) for name, stats in self.stats.items()]
+        rows = [{'name': name, 'calls': int(calls), 'total': total, 'mean': total / calls, 'max': worst}
+                for name, calls, total, worst in snapshot if calls]
+        return sorted(rows, key=lambda r: r['total'], reverse=True)
+
+    def report(self) -> str:
+        lines = [f"{'function':36s} {'calls':>8s} {'total ms':>10s} {'mean ms':>9s} {'max ms':>9s}"]
+        for r in self.summary():
+            lines.append(f"{r['name']:36s} {r['calls']:8d} {r['total'] * 1000:10.2f} "
+                         f"{r['mean'] * 1000:9.3f} {r['max'] * 1000:9.3f}")
+        return '\n'.join(lines)
+
+
+instrumentation = Instrumentation()
+if os.environ.get('FITFLOW_PROFILE'):
+    instrumentation.enable()
+
+
 # ----------------------------- Demo / CLI ------------------------------
 MODULES = [
     'dashboard_info', 'get_profile_stub', 'sample_insights', 'compute_daily_totals', 'sample_posts',
@@ -348,6 +3673,8 @@ def demo():
     ]))
     print('\n=== Demo: search_foods("chicken") ===')
     print(search_foods('chicken'))
+    print('\n=== Demo: estimate_from_description("200g chicken breast with 1 cup brown rice") ===')
+    print(estimate_from_description('200g chicken breast with 1 cup brown rice'))
     print('\n=== Demo: sample_insights ===')
     print(sample_insights())
 
@@ -356,12 +3683,55 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='FitFlow combined Python stubs')
     parser.add_argument('--list', action='store_true', help='List available sections')
     parser.add_argument('--demo', action='store_true', help='Run demo')
+    parser.add_argument('--import-logs', metavar='PATH',
+                        help='Stream a JSONL/CSV/snapshot log file into the database')
+    parser.add_argument('--export-logs', metavar='PATH',
+                        help='Stream logs from the database to a JSONL/CSV/snapshot file')
+    parser.add_argument('--kind', choices=sorted(LOG_KINDS), default='meal', help='Log type to import/export')
+    parser.add_argument('--format', choices=['jsonl', 'csv', 'snapshot'],
+                        help='File format (default: from extension; .ffsnap is a snapshot)')
+    parser.add_argument('--db', default='fitflow.db', help='SQLite database path')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time every public function (and cProfile the run), then print a summary')
+    parser.add_argument('--profile-sample', type=int, default=1, metavar='N',
+                        help='With --profile, run only every Nth call under cProfile')
     args = parser.parse_args()
 
+    if args.profile:
+        instrumentation.enable()
+        instrumentation.start_capture(args.profile_sample)
+
     if args.list:
         list_sections()
     elif args.demo:
         demo()
+    elif args.import_logs:
+        try:
+            with LocalStore(args.db) as store:
+                stats = import_logs(args.import_logs, args.kind, store, args.format)
+        except (OSError, ValueError) as exc:
+            # e.g. a missing file, a truncated snapshot or a snapshot of the other --kind
+            parser.exit(2, f'{parser.prog}: error: cannot import {args.import_logs}: {exc}\n')
+        for line, errors in stats['errors'][:10]:
+            print(f'  line {line}: {"; ".join(errors)}')
+        print(f"Imported {stats['imported']}/{stats['read']} {args.kind} logs "
+              f"in {stats['seconds']:.2f}s ({stats['records_per_sec']:.0f} records/s)")
+    elif args.export_logs:
+        try:
+            with LocalStore(args.db) as store:
+                stats = export_logs(store, args.kind, args.export_logs, args.format)
+        except OSError as exc:
+            parser.exit(2, f'{parser.prog}: error: cannot export to {args.export_logs}: {exc}\n')
+        print(f"Exported {stats['written']} {args.kind} logs "
+              f"in {stats['seconds']:.2f}s ({stats['records_per_sec']:.0f} records/s)")
+    elif args.profile:
+        demo()
     else:
         list_sections()
         print('\nRun with --demo for example output')
+
+    if args.profile:
+        print('\n=== Profile: instrumented functions ===')
+        print(instrumentation.report())
+        print('\n=== Profile: cProfile (sampled calls) ===')
+        print(instrumentation.stop_capture())
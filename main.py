@@ -3,65 +3,124 @@ FitFlow Mobile App - Kivy GUI wrapper for fitflow_combined.py
 This creates an Android-compatible UI using Kivy
 """
 
+import time
+
+# Taken before Kivy loads so the startup report covers import time too
+PROCESS_START = time.perf_counter()
+
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
 from kivy.uix.button import Button
-from kivy.uix.textinput import TextInput
-from kivy.uix.popup import Popup
-from kivy.uix.image import Image
 from kivy.core.window import Window
 from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelItem
 import fitflow_combined as ff
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
+import uuid
+
+IMPORTS_DONE = time.perf_counter()
 
 # Set window size
 Window.size = (400, 800)
 
 
+class LazyTab(TabbedPanelItem):
+    """Tab whose content is built by ``builder`` the first time it is shown."""
+
+    def __init__(self, builder, **kwargs):
+        super().__init__(**kwargs)
+        self.builder = builder
+        self.build_time = None
+
+
+class LazyTabbedPanel(TabbedPanel):
+    """TabbedPanel that builds LazyTab content on first selection."""
+
+    def switch_to(self, header, do_scroll=False):
+        if isinstance(header, LazyTab) and header.content is None:
+            started = time.perf_counter()
+            header.content = header.builder()
+            header.build_time = time.perf_counter() - started
+            ff.instrumentation.record(f'tab:{header.text}', header.build_time)
+        super().switch_to(header, do_scroll=do_scroll)
+
+
 class FitFlowApp(App):
+    TABS = [
+        ('Dashboard', 'build_dashboard'),
+        ('Nutrition', 'build_nutrition'),
+        ('Workouts', 'build_workouts'),
+        ('Community', 'build_community'),
+        ('Settings', 'build_settings'),
+    ]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.user_profile = ff.get_profile_stub()
-        self.daily_logs = []
-        self.meal_logs = []
+        self.store = ff.LocalStore(os.path.join(self.user_data_dir, 'fitflow.db'))
+        self.user_profile = self.store.load_profile() or ff.get_profile_stub()
+        ff.profile_cache.update_profile(self.user_profile)
+        # Only today's meals are needed for the first frame; history is paged or loaded off-thread
+        today = datetime.now().date().isoformat()
+        self.nutrition_totals = ff.NutritionTotals(self.store.iter_load('meal', start=today))
+        self.meal_feed = None
+        self.post_feed = None
+        self.post_order = 'recent'
+        self.dashboard_values = {}
+        self.scheduler = ff.ComputeScheduler(deliver=self.on_ui_thread)
+        # Background sync, and the op log it uploads, only run when a backend is configured;
+        # nothing would ever checkpoint the log otherwise
+        sync_url = os.environ.get('FITFLOW_SYNC_URL')
+        self.oplog = None
+        self.sync = None
+        if sync_url:
+            self.oplog = ff.OpLog(self.store)
+            self.sync = ff.SyncWorker(sync_url, deliver=self.on_ui_thread, on_result=self.on_sync_result)
+            # Upload edits made while offline in earlier sessions
+            self.sync.push_deltas(self.oplog)
+        self.workout_plan = ff.compile_workout_plan(
+            (self.store.load('workout_plan') or [ff.sample_workout_plan()])[0])
 
     def build(self):
         """Build the main UI"""
         self.title = 'FitFlow - Fitness Tracker'
-        
-        # Main container with tabs
-        root = TabbedPanel(do_default_tab=False)
-        
-        # Dashboard Tab
-        dashboard_tab = TabbedPanelItem(text='Dashboard')
-        dashboard_tab.content = self.build_dashboard()
-        root.add_widget(dashboard_tab)
-        
-        # Nutrition Tab
-        nutrition_tab = TabbedPanelItem(text='Nutrition')
-        nutrition_tab.content = self.build_nutrition()
-        root.add_widget(nutrition_tab)
-        
-        # Workouts Tab
-        workouts_tab = TabbedPanelItem(text='Workouts')
-        workouts_tab.content = self.build_workouts()
-        root.add_widget(workouts_tab)
-        
-        # Community Tab
-        community_tab = TabbedPanelItem(text='Community')
-        community_tab.content = self.build_community()
-        root.add_widget(community_tab)
-        
-        # Settings Tab
-        settings_tab = TabbedPanelItem(text='Settings')
-        settings_tab.content = self.build_settings()
-        root.add_widget(settings_tab)
-        
+        build_start = time.perf_counter()
+        
+        # Main container with tabs; each tab builds its content when first opened
+        root = LazyTabbedPanel(do_default_tab=False)
+        self.tabs = {}
+        for text, builder in self.TABS:
+            tab = LazyTab(getattr(self, builder), text=text)
+            root.add_widget(tab)
+            self.tabs[text] = tab
+        root.switch_to(self.tabs['Dashboard'])
+        root.bind(current_tab=self.on_tab_switched)
+        
+        self.startup_times = {
+            'imports': IMPORTS_DONE - PROCESS_START,
+            'build': time.perf_counter() - build_start,
+        }
+        Window.bind(on_flip=self.report_startup)
         return root
 
+    def on_tab_switched(self, panel, tab):
+        """Drop background work requested by the tabs the user left"""
+        for text in self.scheduler.cancel_except(tab.text):
+            # Their placeholders would never fill in; rebuild on next visit
+            self.tabs[text].content = None
+
+    def report_startup(self, window):
+        """Print time to first frame once the first frame is on screen"""
+        window.unbind(on_flip=self.report_startup)
+        self.startup_times['first_frame'] = time.perf_counter() - PROCESS_START
+        times = self.startup_times
+        print(f"Startup: imports {times['imports'] * 1000:.0f} ms, "
+              f"build {times['build'] * 1000:.0f} ms, "
+              f"first frame {times['first_frame'] * 1000:.0f} ms")
+
     def build_dashboard(self):
         """Dashboard view with quick stats"""
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -75,21 +134,15 @@ class FitFlowApp(App):
         content = GridLayout(cols=2, spacing=10, size_hint_y=None, padding=10)
         content.bind(minimum_height=content.setter('height'))
         
-        # Stats cards
-        stats = [
-            ('Overall Score', '78'),
-            ('Water Intake', '6/8 glasses'),
-            ('Sleep', '7 hrs'),
-            ('Steps', '8,243'),
-            ('Calories', '2,150/2,500'),
-            ('Protein', '65g'),
-        ]
-        
-        for stat_title, stat_value in stats:
+        # Stats cards; value labels are kept so saves can refresh them in place
+        self.dashboard_values = {}
+        for stat_title, stat_value in self.dashboard_stats():
             card = BoxLayout(orientation='vertical', size_hint_y=None, height=100)
             card.canvas.clear()
             card.add_widget(Label(text=stat_title, bold=True))
-            card.add_widget(Label(text=stat_value, font_size='18sp'))
+            value_label = Label(text=stat_value, font_size='18sp')
+            card.add_widget(value_label)
+            self.dashboard_values[stat_title] = value_label
             content.add_widget(card)
         
         scroll.add_widget(content)
@@ -97,51 +150,90 @@ class FitFlowApp(App):
         
         return layout
 
+    def dashboard_stats(self):
+        """Card titles and values; targets come from the profile cache, totals from the running aggregator"""
+        targets = ff.profile_cache.targets(self.user_profile)
+        today = self.nutrition_totals.totals(datetime.now().date().isoformat())
+        return [
+            ('Overall Score', '78'),
+            ('Water Intake', '6/8 glasses'),
+            ('Sleep', '7 hrs'),
+            ('Steps', '8,243'),
+            ('Calories', f"{today['calories']:,.0f}/{targets['calories']:,}"),
+            ('Protein', f"{today['protein']:.0f}/{targets['protein']}g"),
+        ]
+
+    def refresh_dashboard(self):
+        """Update the dashboard card values if the tab has been built"""
+        for stat_title, stat_value in self.dashboard_stats():
+            label = self.dashboard_values.get(stat_title)
+            if label is not None:
+                label.text = stat_value
+
     def build_nutrition(self):
         """Nutrition tracking view"""
+        from feed_view import FeedView
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
         title = Label(text='Nutrition Tracker', size_hint_y=0.1, bold=True, font_size='20sp')
         layout.add_widget(title)
         
-        scroll = ScrollView()
-        content = GridLayout(cols=1, spacing=10, size_hint_y=None, padding=10)
-        content.bind(minimum_height=content.setter('height'))
-        
-        # Sample meals
-        meals_section = Label(text='Today\'s Meals:', size_hint_y=None, height=40, bold=True)
-        content.add_widget(meals_section)
-        
-        sample_meals = [
-            'Breakfast: Oatmeal with berries - 350 cal',
-            'Lunch: Chicken & rice - 600 cal',
-            'Snack: Protein bar - 200 cal'
-        ]
+        # Logged meals, newest first, recycled as the user scrolls
+        meals_section = Label(text='Recent Meals:', size_hint_y=None, height=40, bold=True)
+        layout.add_widget(meals_section)
         
-        for meal in sample_meals:
-            meal_label = Label(text=meal, size_hint_y=None, height=40)
-            content.add_widget(meal_label)
+        self.meal_feed = FeedView(self.fetch_meals, row_height=40, size_hint_y=0.45)
+        layout.add_widget(self.meal_feed)
         
         # Add meal button
         add_meal_btn = Button(text='Add Meal', size_hint_y=None, height=50)
         add_meal_btn.bind(on_press=self.show_add_meal_dialog)
-        content.add_widget(add_meal_btn)
+        layout.add_widget(add_meal_btn)
+        
+        scroll = ScrollView(size_hint_y=0.35)
+        content = GridLayout(cols=1, spacing=10, size_hint_y=None, padding=10)
+        content.bind(minimum_height=content.setter('height'))
         
         # Insights
         insights_section = Label(text='Insights:', size_hint_y=None, height=40, bold=True)
         content.add_widget(insights_section)
         
-        insights = ff.sample_insights()
-        for insight in insights.get('insights', []):
-            insight_text = f"{insight['title']}: {insight['description']}"
-            insight_label = Label(text=insight_text, size_hint_y=None, height=60)
-            content.add_widget(insight_label)
+        # Computed off the UI thread; a placeholder shows until it arrives
+        placeholder = Label(text='Loading insights...', size_hint_y=None, height=60)
+        content.add_widget(placeholder)
+        
+        def show_insights(insights):
+            if insights is None:
+                placeholder.text = 'Log at least two meals this week to see insights.'
+                return
+            content.remove_widget(placeholder)
+            for insight in insights.get('insights', []):
+                insight_text = f"{insight['title']}: {insight['description']}"
+                insight_label = Label(text=insight_text, size_hint_y=None, height=60)
+                content.add_widget(insight_label)
+        
+        def show_error(exc):
+            print(f"Nutrition insights failed: {exc!r}")
+            placeholder.text = 'Insights are unavailable right now.'
+        
+        self.store.flush()
+        self.scheduler.submit('Nutrition', self.compute_insights, self.store.path, dict(self.user_profile),
+                              on_result=show_insights, on_error=show_error)
         
         scroll.add_widget(content)
         layout.add_widget(scroll)
         
         return layout
 
+    @staticmethod
+    def compute_insights(db_path, profile):
+        """Nutrition insights for the past week's meals, or None if too few (runs on a worker thread)"""
+        week_start = (datetime.now().date() - timedelta(days=6)).isoformat()
+        # SQLite connections stay on their own thread, so the worker opens its own
+        with ff.LocalStore(db_path) as store:
+            meal_logs = store.load_columns('meal', start=week_start)
+        return ff.generate_nutrition_insights(meal_logs, profile)
+
     def build_workouts(self):
         """Workouts view"""
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -153,19 +245,13 @@ class FitFlowApp(App):
         content = GridLayout(cols=1, spacing=10, size_hint_y=None, padding=10)
         content.bind(minimum_height=content.setter('height'))
         
-        # Sample workout plan
-        exercises = [
-            {'day': 'Monday', 'name': 'Bench Press', 'sets': 4, 'reps': 8},
-            {'day': 'Monday', 'name': 'Incline Dumbbell', 'sets': 3, 'reps': 10},
-            {'day': 'Tuesday', 'name': 'Squat', 'sets': 4, 'reps': 6},
-            {'day': 'Wednesday', 'name': 'Deadlift', 'sets': 3, 'reps': 5},
-        ]
-        
-        for exercise in exercises:
-            ex_text = f"{exercise['day']}: {exercise['name']} - {exercise['sets']}x{exercise['reps']}"
-            ex_btn = Button(text=ex_text, size_hint_y=None, height=50)
-            ex_btn.bind(on_press=lambda x: self.log_exercise(exercise))
-            content.add_widget(ex_btn)
+        # Workout plan, grouped by weekday from the compiled plan's index
+        for day in ff.WEEKDAYS:
+            for exercise in ff.get_today_exercises(self.workout_plan, day):
+                ex_text = f"{day}: {exercise['exercise_name']} - {exercise['sets']}x{exercise['reps']}"
+                ex_btn = Button(text=ex_text, size_hint_y=None, height=50)
+                ex_btn.bind(on_press=lambda x, ex=exercise: self.log_exercise(ex))
+                content.add_widget(ex_btn)
         
         scroll.add_widget(content)
         layout.add_widget(scroll)
@@ -174,31 +260,51 @@ class FitFlowApp(App):
 
     def build_community(self):
         """Community feed"""
+        from kivy.uix.togglebutton import ToggleButton
+        from feed_view import FeedView
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
         title = Label(text='Community', size_hint_y=0.1, bold=True, font_size='20sp')
         layout.add_widget(title)
         
-        scroll = ScrollView()
-        content = GridLayout(cols=1, spacing=10, size_hint_y=None, padding=10)
-        content.bind(minimum_height=content.setter('height'))
+        # Newest or most liked first; both orders are indexed in SQLite
+        order_bar = BoxLayout(size_hint_y=None, height=40, spacing=10)
+        for order, text in (('recent', 'Recent'), ('top', 'Top')):
+            order_btn = ToggleButton(text=text, group='post_order', allow_no_selection=False,
+                                     state='down' if order == self.post_order else 'normal')
+            order_btn.bind(on_press=lambda btn, order=order: self.set_post_order(order))
+            order_bar.add_widget(order_btn)
+        layout.add_widget(order_bar)
         
-        posts = ff.sample_posts()
-        for post in posts:
-            post_text = ff.render_post(post)
-            post_label = Label(text=post_text, size_hint_y=None, height=60)
-            content.add_widget(post_label)
+        # Posts are paged straight from SQLite; each page is a few index seeks
+        self.post_feed = FeedView(self.fetch_posts)
+        layout.add_widget(self.post_feed)
         
         # New post button
         new_post_btn = Button(text='Create Post', size_hint_y=None, height=50)
         new_post_btn.bind(on_press=self.show_new_post_dialog)
-        content.add_widget(new_post_btn)
-        
-        scroll.add_widget(content)
-        layout.add_widget(scroll)
+        layout.add_widget(new_post_btn)
         
         return layout
 
+    def fetch_meals(self, cursor, limit):
+        """One page of logged meals, newest first, via a keyset cursor"""
+        meals, cursor = self.store.page('meal', cursor, limit)
+        return [{'text': ff.render_meal(m)} for m in meals], cursor
+
+    def set_post_order(self, order):
+        """Reload the community feed newest first ('recent') or most liked first ('top')"""
+        if order != self.post_order:
+            self.post_order = order
+            self.post_feed.reset()
+
+    def fetch_posts(self, cursor, limit):
+        """One page of community posts in the chosen order, via a keyset cursor"""
+        posts, next_cursor = self.store.page('post', cursor, limit, self.post_order)
+        if not posts and cursor is None:
+            posts = ff.sample_posts()
+        return [{'text': text} for text in ff.render_posts(posts)], next_cursor
+
     def build_settings(self):
         """Settings view"""
         layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -243,13 +349,19 @@ class FitFlowApp(App):
 
     def show_add_meal_dialog(self, instance):
         """Show dialog to add a meal"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.spinner import Spinner
+        from kivy.uix.textinput import TextInput
         content = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
+        # Defaults to the meal the time of day suggests; the user can pick another
+        meal_type_input = Spinner(text=ff.meal_type_for(), values=list(ff.MEAL_TYPES), size_hint_y=0.3)
         meal_input = TextInput(hint_text='Enter meal name', size_hint_y=0.3)
         calories_input = TextInput(hint_text='Calories', input_filter='int', size_hint_y=0.3)
         protein_input = TextInput(hint_text='Protein (g)', input_filter='int', size_hint_y=0.3)
         
         content.add_widget(Label(text='Add New Meal'))
+        content.add_widget(meal_type_input)
         content.add_widget(meal_input)
         content.add_widget(calories_input)
         content.add_widget(protein_input)
@@ -264,7 +376,29 @@ class FitFlowApp(App):
         popup = Popup(title='Add Meal', content=content, size_hint=(0.9, 0.7))
         
         def save_meal(btn):
-            # Save meal logic here
+            calories = int(calories_input.text or 0)
+            protein = int(protein_input.text or 0)
+            meal = {
+                'log_date': datetime.now().date().isoformat(),
+                'meal_type': meal_type_input.text,
+                'foods': [{'name': meal_input.text, 'calories': calories, 'protein': protein}],
+                'total_calories': calories,
+                'total_protein': protein,
+            }
+            # Record the op first so the meal carries its sync id when stored
+            if self.oplog is not None:
+                self.oplog.record_put('meal', meal)
+            self.store.put('meal', meal)
+            # User saves are written now, not when the batch fills
+            self.store.flush()
+            if self.sync is not None:
+                self.sync.push_deltas(self.oplog)
+            # Running totals update in O(1); no rescan of the day's meals
+            self.nutrition_totals.add_meal(meal)
+            self.refresh_dashboard()
+            ff.chart_data.invalidate(ff.LOCAL_USER, 'meal')
+            if self.meal_feed is not None:
+                self.meal_feed.prepend({'text': ff.render_meal(meal)})
             popup.dismiss()
         
         save_btn.bind(on_press=save_meal)
@@ -274,6 +408,8 @@ class FitFlowApp(App):
 
     def show_new_post_dialog(self, instance):
         """Show dialog to create a new community post"""
+        from kivy.uix.popup import Popup
+        from kivy.uix.textinput import TextInput
         content = BoxLayout(orientation='vertical', padding=10, spacing=10)
         
         post_input = TextInput(hint_text='What\'s on your mind?', size_hint_y=0.6)
@@ -292,6 +428,16 @@ class FitFlowApp(App):
         popup = Popup(title='New Post', content=content, size_hint=(0.9, 0.7))
         
         def submit_post(btn):
+            if post_input.text.strip():
+                post = {'id': uuid.uuid4().hex, 'content': post_input.text.strip(),
+                        'created_date': datetime.now().isoformat()}
+                self.store.put('post', post)
+                self.store.flush()
+                if self.sync is not None:
+                    self.sync.queue_write('post', post)
+                # A new post has no likes, so it only leads the 'recent' order
+                if self.post_feed is not None and self.post_order == 'recent':
+                    self.post_feed.prepend({'text': ff.render_post(post)})
             popup.dismiss()
         
         post_btn.bind(on_press=submit_post)
@@ -301,7 +447,7 @@ class FitFlowApp(App):
 
     def log_exercise(self, exercise):
         """Log an exercise completion"""
-        print(f"Logged: {exercise['name']}")
+        print(f"Logged: {exercise['exercise_name']}")
 
     def edit_profile(self, instance):
         """Edit user profile"""
@@ -311,6 +457,32 @@ class FitFlowApp(App):
         """Logout user"""
         self.stop()
 
+    def on_ui_thread(self, fn):
+        """Run ``fn`` on the Kivy thread at the next frame"""
+        Clock.schedule_once(lambda dt: fn())
+
+    def on_sync_result(self, result):
+        """Report a sync batch outcome (called on the UI thread)"""
+        if not result['ok']:
+            print(f"Sync of {result['count']} {result['kind']} records failed: {result['error']}")
+
+    def on_pause(self):
+        """Flush pending writes; Android may kill a paused app without calling on_stop"""
+        self.store.flush()
+        return True
+
+    def on_stop(self):
+        """Flush pending writes before the app exits"""
+        if ff.instrumentation.enabled:
+            print(ff.instrumentation.report())
+        self.scheduler.shutdown()
+        # Local writes must land even if the sync backend can't be reached
+        try:
+            if self.sync is not None:
+                self.sync.stop()
+        finally:
+            self.store.close()
+
 
 if __name__ == '__main__':
     FitFlowApp().run()
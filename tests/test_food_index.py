@@ -0,0 +1,92 @@
+"""FoodIndex and search_foods against a plain substring scan."""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+
+WORDS = ['chicken', 'breast', 'brown', 'rice', 'salmon', 'oat', 'oatmeal', 'greek', 'yogurt', 'egg', 'bread']
+
+
+def scan(foods, query):
+    q = query.lower().strip()
+    return [f for f in foods if q in f['name'].lower()]
+
+
+class FoodIndexTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.foods = [{'name': ' '.join(rng.sample(WORDS, rng.randint(1, 3))).title()} for _ in range(300)]
+        self.index = ff.FoodIndex(self.foods)
+
+    def assertSameFoods(self, got, expected):
+        self.assertEqual(sorted(map(id, got)), sorted(map(id, expected)))
+
+    def test_matches_equal_a_substring_scan(self):
+        for query in ['', 'c', 'ch', 'chi', 'chicken', 'en br', 'RICE', ' oat ', 'oatm', 'xyz', 'n b']:
+            with self.subTest(query=query):
+                self.assertSameFoods(self.index.search(query), scan(self.foods, query))
+
+    def test_ranking_prefers_exact_then_prefix_then_word_prefix(self):
+        index = ff.FoodIndex([{'name': 'Brown Rice'}, {'name': 'Rice Cake'}, {'name': 'Rice'},
+                              {'name': 'Licorice'}])
+        self.assertEqual([f['name'] for f in index.search('rice')],
+                         ['Rice', 'Rice Cake', 'Brown Rice', 'Licorice'])
+
+    def test_limit_returns_the_best_matches(self):
+        self.assertEqual(self.index.search('e', limit=5), self.index.search('e')[:5])
+
+    def test_ties_follow_insertion_order_after_removal(self):
+        index = ff.FoodIndex([{'name': 'Apple A'}, {'name': 'Apple B'}, {'name': 'Apple C'}])
+        self.assertEqual(index.remove('apple a'), 1)
+        index.insert({'name': 'Apple D'})
+        self.assertEqual([f['name'] for f in index.search('apple')], ['Apple B', 'Apple C', 'Apple D'])
+
+    def test_removal_keeps_results_consistent(self):
+        names = {f['name'] for f in self.foods}
+        for name in sorted(names)[::2]:
+            self.index.remove(name)
+        survivors = [f for f in self.foods if f['name'] not in sorted(names)[::2]]
+        self.assertEqual(len(self.index), len(survivors))
+        for query in ['', 'o', 'rice', 'egg']:
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query),
+                                 ff.FoodIndex(survivors).search(query))
+
+
+class SearchFoodsTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = ff.FOOD_DATABASE
+        ff.FOOD_DATABASE = ff.FoodList(self.saved)
+
+    def tearDown(self):
+        ff.FOOD_DATABASE = self.saved
+
+    def test_index_follows_list_mutations(self):
+        self.assertEqual([f['name'] for f in ff.search_foods('salmon')], ['Salmon'])
+        ff.FOOD_DATABASE[2] = {'name': 'Smoked Salmon', 'calories': 117}
+        self.assertEqual([f['name'] for f in ff.search_foods('salmon')], ['Smoked Salmon'])
+        ff.add_food({'name': 'Salmon Roe'})
+        self.assertEqual([f['name'] for f in ff.search_foods('salmon')], ['Salmon Roe', 'Smoked Salmon'])
+        self.assertEqual(ff.remove_food('smoked salmon'), 1)
+        self.assertEqual(ff.search_foods('salmon'), scan(ff.FOOD_DATABASE, 'salmon'))
+
+    def test_remove_food_takes_every_food_with_that_name(self):
+        ff.add_food({'name': 'salmon', 'calories': 200})
+        self.assertEqual(ff.remove_food('tofu'), 0)
+        self.assertEqual(ff.remove_food('SALMON'), 2)
+        self.assertEqual([f['name'] for f in ff.FOOD_DATABASE], ['Chicken Breast', 'Brown Rice'])
+        self.assertEqual(ff.search_foods('salmon'), [])
+
+    def test_plain_list_is_rejected(self):
+        ff.FOOD_DATABASE = list(self.saved)
+        with self.assertRaisesRegex(TypeError, 'FOOD_DATABASE must be a FoodList'):
+            ff.search_foods('rice')
+
+
+if __name__ == '__main__':
+    unittest.main()
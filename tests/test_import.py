@@ -0,0 +1,79 @@
+"""Streaming import/export and how bad records are skipped."""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+MEALS = [
+    {'log_date': '2024-01-01', 'meal_type': 'lunch', 'foods': [{'name': 'Rice', 'calories': 200}],
+     'total_calories': 200},
+    {'log_date': '2024-01-02', 'meal_type': 'dinner', 'foods': [], 'total_calories': 450.5},
+]
+
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = ff.LocalStore()
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+        return path
+
+    def test_jsonl_skips_bad_lines_and_reports_them(self):
+        lines = [json.dumps(MEALS[0]), '{"log_date": "2024-01-03", "meal_type"', '',
+                 json.dumps({'log_date': '2024-01-04', 'foods': []}), json.dumps(MEALS[1])]
+        stats = ff.import_logs(self.write('meals.jsonl', '\n'.join(lines) + '\n'), 'meal', self.store)
+        self.assertEqual((stats['read'], stats['imported'], stats['rejected']), (4, 2, 2))
+        self.assertEqual([line for line, _ in stats['errors']], [2, 4])
+        self.assertTrue(stats['errors'][0][1][0].startswith('invalid JSON: '))
+        self.assertEqual(stats['errors'][1][1], ['missing meal_type'])
+        self.assertEqual([m['log_date'] for m in self.store.load('meal')], ['2024-01-01', '2024-01-02'])
+
+    def test_csv_skips_unreadable_values(self):
+        text = ('log_date,steps,water_glasses\n'
+                '2024-01-01,1200,4\n'
+                '2024-01-02,lots,3\n'
+                '2024-01-03,800,\n')
+        stats = ff.import_logs(self.write('daily.csv', text), 'daily', self.store)
+        self.assertEqual((stats['read'], stats['imported'], stats['rejected']), (3, 2, 1))
+        self.assertEqual(stats['errors'][0][0], 3)
+        self.assertTrue(stats['errors'][0][1][0].startswith('unreadable value: '))
+        self.assertEqual([d['water_glasses'] for d in self.store.load('daily')], [4, 0])
+
+    def test_iter_records_still_raises_on_bad_lines(self):
+        path = self.write('meals.jsonl', json.dumps(MEALS[0]) + '\nnot json\n')
+        with self.assertRaisesRegex(ValueError, r'meals\.jsonl:2: invalid JSON'):
+            list(ff.iter_records(path, 'meal'))
+
+    def test_export_round_trips_every_format(self):
+        for record in MEALS:
+            self.store.put('meal', record)
+        for name in ('out.jsonl', 'out.csv', 'out.ffsnap'):
+            with self.subTest(name=name):
+                path = os.path.join(self.dir.name, name)
+                self.assertEqual(ff.export_logs(self.store, 'meal', path)['written'], 2)
+                with ff.LocalStore() as other:
+                    self.assertEqual(ff.import_logs(path, 'meal', other)['imported'], 2)
+                    self.assertEqual(other.load('meal'), self.store.load('meal'))
+
+    def test_snapshot_of_another_kind_is_rejected(self):
+        path = os.path.join(self.dir.name, 'daily.ffsnap')
+        ff.write_records([{'log_date': '2024-01-01', 'steps': 10}], path, 'daily')
+        with self.assertRaisesRegex(ValueError, 'not MealLog'):
+            ff.import_logs(path, 'meal', self.store)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""Nutrition insights for profiles with unusual or missing fields."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+MEALS = [{'log_date': '2024-01-01', 'total_calories': 500, 'total_protein': 40},
+         {'log_date': '2024-01-02', 'total_calories': 700, 'total_protein': 60}]
+
+
+class InsightsTest(unittest.TestCase):
+    def test_zero_or_missing_weight_uses_the_default(self):
+        expected = ff.generate_nutrition_insights(MEALS, {'weight': 70})
+        for profile in ({'weight': 0}, {'weight': None}, {}):
+            with self.subTest(profile=profile):
+                self.assertEqual(ff.generate_nutrition_insights(MEALS, profile), expected)
+
+    def test_zero_protein_target_skips_the_protein_score(self):
+        stats = ff.user_nutrition_stats(MEALS, None, {})
+        stats['protein_target_per_kg'] = 0
+        result = ff.insights_from_stats(stats)
+        self.assertNotIn('Protein Intake', [i['title'] for i in result['insights']])
+        self.assertIsInstance(result['goalAlignment'], int)
+
+    def test_batch_survives_a_weightless_profile(self):
+        users = [{'user_id': 1, 'meal_logs': MEALS, 'profile': {'weight': 0}},
+                 {'user_id': 2, 'meal_logs': MEALS, 'profile': {'weight': None}}]
+        results = ff.batch_nutrition_insights(users, workers=0)['results']
+        self.assertEqual([r['user_id'] for r in results], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""LocalStore batching, round trips and keyset paging."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+
+class LocalStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'fitflow.db')
+        self.store = ff.LocalStore(self.path, batch_size=3)
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def stored_rows(self, table):
+        # A second connection only sees what has been committed
+        with ff.LocalStore(self.path) as other:
+            return other.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def test_writes_are_batched_until_full(self):
+        for day in ('2024-01-01', '2024-01-02'):
+            self.store.put('daily', {'log_date': day})
+        self.assertEqual(self.stored_rows('daily_logs'), 0)
+        self.store.put('daily', {'log_date': '2024-01-03'})
+        self.assertEqual(self.stored_rows('daily_logs'), 3)
+
+    def test_flush_and_reads_write_pending_records(self):
+        self.store.put('meal', {'log_date': '2024-01-01', 'meal_type': 'lunch', 'foods': []})
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.store.flush(), 0)
+        self.assertEqual(self.stored_rows('meal_logs'), 1)
+        self.store.put('meal', {'log_date': '2024-01-02', 'meal_type': 'dinner', 'foods': []})
+        self.assertEqual(len(self.store.load('meal')), 2)
+
+    def test_records_round_trip_with_extra_fields(self):
+        meal = {'id': 'm1', 'log_date': '2024-01-01', 'meal_type': 'lunch',
+                'foods': [{'name': 'Rice', 'calories': 200}], 'total_calories': 200, 'source': 'import'}
+        self.store.put('meal', meal)
+        self.assertEqual(self.store.load('meal'), [meal])
+        self.assertEqual(self.store.load('meal', start='2024-01-02'), [])
+
+    def test_keyed_kinds_replace_and_delete(self):
+        self.store.put('daily', {'log_date': '2024-01-01', 'steps': 100})
+        self.store.put('daily', {'log_date': '2024-01-01', 'steps': 200})
+        self.assertEqual(self.store.load('daily'), [{'log_date': '2024-01-01', 'steps': 200}])
+        self.store.delete('daily', '2024-01-01')
+        self.assertEqual(self.store.load('daily'), [])
+        with self.assertRaises(ValueError):
+            self.store.delete('meal', 'm1')
+
+    def walk(self, kind, limit, order='recent'):
+        pages, cursor = [], None
+        while True:
+            records, cursor = self.store.page(kind, cursor, limit, order)
+            pages.append(records)
+            if cursor is None:
+                return pages
+
+    def test_post_pages_are_newest_first_without_gaps_or_repeats(self):
+        posts = [{'id': f'p{i:02d}', 'content': str(i), 'created_date': f'2024-01-{i % 5 + 1:02d}T10:00:00'}
+                 for i in range(23)]
+        posts.append({'id': 'undated', 'content': 'no date'})
+        self.store.put_many('post', posts)
+        pages = self.walk('post', 5)
+        self.assertEqual([len(p) for p in pages], [5, 5, 5, 5, 4])
+        ids = [p['id'] for page in pages for p in page]
+        expected = sorted(posts[:-1], key=lambda p: (p['created_date'], p['id']), reverse=True)
+        self.assertEqual(ids, [p['id'] for p in expected] + ['undated'])
+
+    def test_pages_ignore_posts_added_after_the_cursor(self):
+        self.store.put_many('post', [{'id': f'p{i}', 'content': '', 'created_date': f'2024-01-0{i}'}
+                                     for i in range(1, 7)])
+        first, cursor = self.store.page('post', None, 3)
+        self.store.put('post', {'id': 'new', 'content': '', 'created_date': '2024-02-01'})
+        second, _ = self.store.page('post', cursor, 3)
+        self.assertEqual([p['id'] for p in first + second], ['p6', 'p5', 'p4', 'p3', 'p2', 'p1'])
+
+    def test_top_posts_are_most_liked_then_newest(self):
+        posts = [{'id': f'p{i:02d}', 'content': '', 'likes': i % 4, 'created_date': f'2024-01-{i % 7 + 1:02d}'}
+                 for i in range(20)]
+        posts.append({'id': 'unliked', 'content': '', 'created_date': '2024-02-01'})
+        self.store.put_many('post', posts)
+        ids = [p['id'] for page in self.walk('post', 3, 'top') for p in page]
+        expected = sorted(posts, key=lambda p: (p.get('likes', 0), p['created_date'], p['id']), reverse=True)
+        self.assertEqual(ids, [p['id'] for p in expected])
+
+    def test_liking_a_post_moves_it_in_the_top_order(self):
+        self.store.put_many('post', [{'id': f'p{i}', 'content': '', 'likes': i, 'created_date': f'2024-01-0{i}'}
+                                     for i in range(1, 5)])
+        self.store.put('post', {'id': 'p1', 'content': '', 'likes': 9, 'created_date': '2024-01-01'})
+        top, _ = self.store.page('post', None, 2, 'top')
+        self.assertEqual([p['id'] for p in top], ['p1', 'p4'])
+
+    def test_bad_cursors_and_orders_raise_value_error(self):
+        self.store.put('post', {'id': 'p1', 'content': '', 'created_date': '2024-01-01'})
+        for bad in ('not json', '{"a": 1}', '[1]', '[[1], "p1"]', 5):
+            with self.subTest(cursor=bad), self.assertRaisesRegex(ValueError, 'invalid page cursor'):
+                self.store.page('post', bad)
+        with self.assertRaisesRegex(ValueError, 'no .top. order'):
+            self.store.page('meal', order='top')
+
+    def test_keyless_meals_page_on_rowid(self):
+        self.store.put_many('meal', [{'log_date': '2024-01-01', 'meal_type': 'snack', 'foods': [],
+                                      'total_calories': i} for i in range(7)])
+        pages = self.walk('meal', 3)
+        self.assertEqual([m['total_calories'] for page in pages for m in page], [6, 5, 4, 3, 2, 1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
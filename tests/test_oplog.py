@@ -0,0 +1,71 @@
+"""OpLog compaction, checkpoints and persistence."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+
+class OpLogTest(unittest.TestCase):
+    def test_new_record_and_later_edits_compact_to_one_put(self):
+        oplog = ff.OpLog()
+        log = ff.make_log('2024-01-01', water=2, oplog=oplog)
+        ff.update_field(log, 'water_glasses', 5, oplog=oplog)
+        ff.update_field(log, 'steps', 900, oplog=oplog)
+        deltas, upto = oplog.deltas()
+        self.assertEqual(upto, 3)
+        self.assertEqual(deltas, {'daily': [{'log_date': '2024-01-01', 'water_glasses': 5,
+                                             'sleep_hours': 0.0, 'steps': 900}]})
+
+    def test_edits_to_a_synced_record_become_a_patch(self):
+        oplog = ff.OpLog()
+        log = ff.make_log('2024-01-01', oplog=oplog)
+        oplog.checkpoint(oplog.deltas()[1])
+        ff.update_field(log, 'sleep_hours', 7.5, oplog=oplog)
+        ff.update_field(log, 'sleep_hours', 8.0, oplog=oplog)
+        ff.update_field(log, 'steps', 0, oplog=oplog)    # unchanged, not logged
+        deltas, _ = oplog.deltas()
+        self.assertEqual(deltas, {'daily': [{'log_date': '2024-01-01', '_op': 'patch', 'sleep_hours': 8.0}]})
+
+    def test_delete_wins_over_earlier_ops_and_keys_are_assigned(self):
+        oplog = ff.OpLog()
+        meal = {'log_date': '2024-01-01', 'meal_type': 'lunch', 'foods': []}
+        oplog.record_put('meal', meal)
+        self.assertTrue(meal['id'])
+        oplog.record_set('meal', meal, 'total_calories', 400)
+        oplog.record_delete('meal', meal)
+        deltas, _ = oplog.deltas()
+        self.assertEqual(deltas, {'meal': [{'id': meal['id'], '_deleted': True}]})
+
+    def test_checkpoint_drops_only_uploaded_ops(self):
+        oplog = ff.OpLog()
+        ff.make_log('2024-01-01', oplog=oplog)
+        _, upto = oplog.deltas()
+        ff.make_log('2024-01-02', oplog=oplog)
+        oplog.checkpoint(upto)
+        deltas, _ = oplog.deltas()
+        self.assertEqual([r['log_date'] for r in deltas['daily']], ['2024-01-02'])
+
+    def test_ops_survive_a_restart_until_checkpointed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'fitflow.db')
+            with ff.LocalStore(path) as store:
+                oplog = ff.OpLog(store)
+                ff.make_log('2024-01-01', oplog=oplog)
+                _, upto = oplog.deltas()
+                ff.make_log('2024-01-02', water=3, oplog=oplog)
+                oplog.checkpoint(upto)
+            with ff.LocalStore(path) as store:
+                oplog = ff.OpLog(store)
+                deltas, upto = oplog.deltas()
+                self.assertEqual(upto, 2)
+                self.assertEqual([(r['log_date'], r['water_glasses']) for r in deltas['daily']],
+                                 [('2024-01-02', 3)])
+                self.assertEqual(len(store.load_ops()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
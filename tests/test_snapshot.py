@@ -0,0 +1,71 @@
+"""Binary log snapshots: round trip, aggregation and corrupt files."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+
+def meals(n):
+    return [{'log_date': f'2024-01-{i % 28 + 1:02d}', 'meal_type': 'lunch',
+             'foods': [{'name': 'Rice', 'calories': i}], 'total_calories': i, 'total_protein': 1.5}
+            for i in range(n)]
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'meals.ffsnap')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        records = meals(100)
+        records[0]['total_fat'] = None
+        records[1]['notes'] = 'off-schema'
+        records[2]['total_carbs'] = 2 ** 60 + 1
+        records[3]['meal_type'] = None
+        records[4]['total_calories'] = 'lots'
+        self.assertEqual(ff.write_snapshot(records, self.path, ff.meal_log_schema), 100)
+        with ff.open_snapshot(self.path) as snap:
+            self.assertEqual(len(snap), 100)
+            self.assertEqual(snap.to_dicts(), records)
+            self.assertEqual(sorted(snap.by_date), sorted({r['log_date'] for r in records}))
+
+    def test_aggregates_match_the_records(self):
+        records = meals(1000)
+        ff.write_snapshot(records, self.path, ff.meal_log_schema)
+        with ff.open_snapshot(self.path) as snap:
+            self.assertEqual(ff.compute_daily_totals(snap), ff.compute_daily_totals(records))
+
+    def test_write_leaves_no_temporary_files(self):
+        ff.write_snapshot(meals(10), self.path, ff.meal_log_schema)
+        ff.write_snapshot(meals(20), self.path, ff.meal_log_schema)
+        self.assertEqual(os.listdir(self.dir.name), ['meals.ffsnap'])
+        with ff.open_snapshot(self.path) as snap:
+            self.assertEqual(len(snap), 20)
+
+    def test_truncated_file_is_rejected(self):
+        ff.write_snapshot(meals(1000), self.path, ff.meal_log_schema)
+        with open(self.path, 'rb') as fh:
+            data = fh.read()
+        for size in (5000, len(data) - 1, 10):
+            with self.subTest(size=size):
+                with open(self.path, 'wb') as fh:
+                    fh.write(data[:size])
+                with self.assertRaises(ValueError):
+                    ff.open_snapshot(self.path)
+
+    def test_other_files_are_rejected(self):
+        with open(self.path, 'wb') as fh:
+            fh.write(b'{"log_date": "2024-01-01"}\n' * 10)
+        with self.assertRaises(ValueError):
+            ff.open_snapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+"""SyncClient / SyncWorker against the in-process LocalSyncServer."""
+import asyncio
+import os
+import queue
+import socket
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SyncClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.results = []
+        self.server = await ff.LocalSyncServer().start()
+        self.client = ff.SyncClient(self.server.url, backoff=0.001, on_result=self.results.append)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def test_writes_to_the_same_record_coalesce(self):
+        self.client.queue_write('meal', {'id': 'm1', 'log_date': '2024-01-01', 'total_calories': 300})
+        self.client.queue_write('meal', {'id': 'm1', 'total_calories': 450})
+        self.client.queue_write('meal', {'id': 'm2', 'log_date': '2024-01-02', 'total_calories': 200})
+        results = await self.client.flush()
+        self.assertEqual([(r['kind'], r['count'], r['ok']) for r in results], [('meal', 2, True)])
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.server.records['meal']['m1'],
+                         {'id': 'm1', 'log_date': '2024-01-01', 'total_calories': 450})
+
+    async def test_503_is_retried(self):
+        self.server.fail_first = 2
+        self.client.queue_write('daily', {'log_date': '2024-01-01', 'water_glasses': 6})
+        [result] = await self.client.flush()
+        self.assertTrue(result['ok'])
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual(result['status'], 200)
+        self.assertIn('2024-01-01', self.server.records['daily'])
+        self.assertEqual(self.results, [result])
+
+    async def test_retries_give_up_after_max_retries(self):
+        self.server.fail_first = 10
+        self.client.max_retries = 2
+        self.client.queue_write('daily', {'log_date': '2024-01-01'})
+        [result] = await self.client.flush()
+        self.assertFalse(result['ok'])
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual(result['error'], 'server returned 503')
+
+    async def test_pull_filters_by_since(self):
+        for day in ('2024-01-01', '2024-01-05', '2024-01-09'):
+            self.client.queue_write('daily', {'log_date': day, 'water_glasses': 8})
+        await self.client.flush()
+        records = await self.client.pull('daily', since='2024-01-05')
+        self.assertEqual([r['log_date'] for r in records], ['2024-01-05', '2024-01-09'])
+        self.assertEqual(len(await self.client.pull('daily')), 3)
+
+    async def test_pull_with_empty_body_returns_nothing(self):
+        async def empty(method, path, payload=None):
+            return 200, None
+
+        self.client.pool.request = empty
+        self.assertEqual(await self.client.pull('daily'), [])
+
+    async def test_pull_error_status_raises(self):
+        self.client.prefix = '/missing'
+        with self.assertRaises(ff.SyncError):
+            await self.client.pull('daily')
+
+
+class DroppedConnectionTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = await ff.LocalSyncServer(keep_alive=False).start()
+        self.client = ff.SyncClient(self.server.url, max_retries=0)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def test_requests_survive_the_server_closing_idle_connections(self):
+        self.assertEqual(await self.client.pull('daily'), [])
+        self.assertEqual(await self.client.pull('daily'), [])
+        self.assertEqual((await self.client.check_auth())['authenticated'], True)
+        self.client.queue_write('daily', {'log_date': '2024-01-01'})
+        [result] = await self.client.flush()
+        self.assertTrue(result['ok'])
+        self.assertEqual(result['attempts'], 1)
+        self.assertEqual(self.client.pool.opened, 4)
+
+
+class ServerDownTest(unittest.IsolatedAsyncioTestCase):
+    async def test_unreachable_server_reports_failure(self):
+        results = []
+        client = ff.SyncClient(f'http://127.0.0.1:{free_port()}', max_retries=2, backoff=0.001,
+                               on_result=results.append)
+        client.queue_write('meal', {'id': 'm1', 'log_date': '2024-01-01'})
+        [result] = await client.flush()
+        await client.close()
+        self.assertFalse(result['ok'])
+        self.assertEqual(result['attempts'], 3)
+        self.assertIsNone(result['status'])
+        self.assertTrue(result['error'])
+        self.assertEqual(results, [result])
+
+
+class SyncWorkerTest(unittest.TestCase):
+    def setUp(self):
+        # The server gets its own loop thread, as the real backend would be out of process
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(ff.LocalSyncServer().start(), self.loop).result(5)
+        self.results = []
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def test_queued_writes_reach_the_server_and_pull_back(self):
+        worker = ff.SyncWorker(self.server.url, on_result=self.results.append, backoff=0.001)
+        pulled = []
+        done = threading.Event()
+
+        def on_pull(future):
+            pulled.extend(future.result())
+            done.set()
+
+        try:
+            worker.queue_write('body', {'log_date': '2024-01-01', 'weight': 80.0})
+            worker.queue_write('body', {'log_date': '2024-01-01', 'weight': 79.5})
+            worker.flush().result(5)
+            worker.pull('body', on_pull)
+            self.assertTrue(done.wait(5))
+        finally:
+            worker.stop()
+        self.assertEqual([(r['count'], r['ok']) for r in self.results], [(1, True)])
+        self.assertEqual(pulled, [{'log_date': '2024-01-01', 'weight': 79.5}])
+
+    def test_pushes_never_overlap_and_later_ops_follow(self):
+        # Delivered callbacks wait in a queue, standing in for the UI thread
+        delivered = queue.Queue()
+        worker = ff.SyncWorker(self.server.url, deliver=delivered.put, backoff=0.001)
+        oplog = ff.OpLog()
+        try:
+            oplog.record_put('meal', {'id': 'm1', 'log_date': '2024-01-01', 'total_calories': 300})
+            first = worker.push_deltas(oplog)
+            oplog.record_set('meal', {'id': 'm1'}, 'total_calories', 350)
+            self.assertIsNone(worker.push_deltas(oplog))
+            self.assertTrue(first.result(5))
+            delivered.get(timeout=5)()
+            self.assertEqual([op['op'] for op in oplog.ops], ['set'])
+            delivered.get(timeout=5)()
+        finally:
+            worker.stop()
+        self.assertEqual(oplog.ops, [])
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.server.records['meal']['m1']['total_calories'], 350)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Compiled SchemaValidator checks."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitflow_combined as ff  # noqa: E402
+
+
+class SchemaValidatorTest(unittest.TestCase):
+    def setUp(self):
+        self.meal = ff.validator_for('MealLog')
+
+    def test_valid_record_gets_defaults_without_mutating_input(self):
+        daily = ff.validator_for('DailyLog')
+        record = {'log_date': '2024-01-01', 'steps': 1200}
+        result = daily.validate(record)
+        self.assertTrue(result['valid'])
+        self.assertEqual(result['record'], {'log_date': '2024-01-01', 'steps': 1200,
+                                            'water_glasses': 0, 'sleep_hours': 0})
+        self.assertEqual(record, {'log_date': '2024-01-01', 'steps': 1200})
+        self.assertIs(daily.validate(record, fill_defaults=False)['record'], record)
+
+    def test_missing_required_fields(self):
+        result = self.meal.validate({'log_date': '2024-01-01', 'foods': None})
+        self.assertFalse(result['valid'])
+        self.assertEqual(result['missing'], ['meal_type', 'foods'])
+
+    def test_type_format_and_enum_errors(self):
+        result = self.meal.validate({'log_date': '2024-13-01', 'meal_type': 'brunch', 'foods': [],
+                                     'total_calories': True, 'total_fat': '3'})
+        self.assertEqual(sorted(result['errors']), [
+            'log_date: invalid date',
+            "meal_type: expected one of ['breakfast', 'dinner', 'lunch', 'snack']",
+            'total_calories: expected number',
+            'total_fat: expected number',
+        ])
+
+    def test_nested_food_items_are_checked(self):
+        result = self.meal.validate({'log_date': '2024-01-01', 'meal_type': 'lunch',
+                                     'foods': [{'name': 'Rice', 'calories': 200}, {'calories': 'lots'}]})
+        self.assertFalse(result['valid'])
+        self.assertEqual(len(result['errors']), 1)
+        self.assertTrue(result['errors'][0].startswith('foods[1]: '))
+
+    def test_non_mapping_is_rejected(self):
+        self.assertEqual(self.meal.validate(['not', 'a', 'record'])['errors'], ['expected object'])
+
+    def test_validate_many_splits_valid_and_invalid(self):
+        batch = [{'log_date': '2024-01-01', 'meal_type': 'lunch', 'foods': []},
+                 {'meal_type': 'lunch', 'foods': []},
+                 {'log_date': '2024-01-02', 'meal_type': 'snack', 'foods': [], 'total_protein': 'x'}]
+        result = self.meal.validate_many(batch)
+        self.assertEqual(result['valid'], [batch[0]])
+        self.assertEqual(result['invalid'], [(1, ['missing log_date']), (2, ['total_protein: expected number'])])
+
+    def test_records_validate_like_dicts(self):
+        record = ff.MealLog({'log_date': '2024-01-01', 'meal_type': 'dinner', 'foods': [{'name': 'Salmon'}]})
+        self.assertTrue(self.meal.validate(record)['valid'])
+
+
+if __name__ == '__main__':
+    unittest.main()